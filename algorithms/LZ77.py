@@ -6,6 +6,7 @@ It compresses data by finding repeated sequences and encoding them.
 import mmap
 import os
 import struct
+from array import array
 
 from bitarray import bitarray
 
@@ -17,6 +18,8 @@ class LZ77:
     """
 
     MAX_WINDOW_SIZE = 4096  # Maximum size of the search window
+    WINDOW_MASK = MAX_WINDOW_SIZE - 1  # Index into the prev chain ring
+    MAX_CHAIN_LENGTH = 128  # Most candidates tried per position
 
     def __init__(self, window_size=None):
         if window_size is None:
@@ -25,74 +28,63 @@ class LZ77:
         self.lookahead_buffer_size = 15
 
     def find_match(
-        self, data: bytes, current_position: int, hash_table: dict
+        self, data: bytes, current_position: int, hash_table: dict, prev: array
     ) -> tuple[int, int] | None:
         """
-        Find the longest match in the search window using a hash table,
-        with integrated cleanup of stale candidate positions.
+        Find the longest match in the search window using a zlib-style hash
+        chain: hash_table maps a 3-byte prefix to its latest position and
+        prev links every position to the previous one with the same prefix.
         """
-        end_of_buffer = min(current_position + self.lookahead_buffer_size, len(data))
+        data_len = len(data)
 
         # If we're at the end of the data, there's no match
-        if current_position >= len(data):
+        if current_position >= data_len:
             return None
 
         best_match_distance = 0
         best_match_length = 0
 
-        # Update hash table with the current substring
+        # Link the substring ending at the current position into its chain
         if current_position >= 2:  # Ensure we have at least 3 bytes to hash
-            substring = data[current_position - 2 : current_position + 1]
-            hash_key_to_add = hash(substring)
-            if hash_key_to_add not in hash_table:
-                hash_table[hash_key_to_add] = []
-            hash_table[hash_key_to_add].append(current_position - 2)
-
-        # Get the current substring to match
-        if current_position + 2 < len(data):
-            current_substring = data[current_position : current_position + 3]
-            hash_key_to_find = hash(current_substring)
-
-            # Check candidate positions from the hash table
-            if hash_key_to_find in hash_table:
-                candidate_list = hash_table[hash_key_to_find]
-
-                # Determine the minimum valid candidate position
-                min_valid_candidate_pos = current_position - (self.window_size - 1)
-
-                # Create a new list containing only valid candidates
-                valid_candidates = [
-                    pos for pos in candidate_list if pos >= min_valid_candidate_pos
-                ]
-
-                # Update the entry in the hash table
-                if not valid_candidates:
-                    # If after cleaning the list is empty, delete the key
-                    del hash_table[hash_key_to_find]
-                else:
-                    # Otherwise replace the old list with the cleaned one
-                    hash_table[hash_key_to_find] = valid_candidates
-
-                    # Iterate over the cleaned list of valid candidates
-                    for candidate_position in valid_candidates:
-                        distance = current_position - candidate_position
-
-                        match_length = 0
-                        while (
-                            current_position + match_length < len(data)
-                            and candidate_position + match_length < current_position
-                            and match_length < self.lookahead_buffer_size
-                            and data[candidate_position + match_length]
-                            == data[current_position + match_length]
-                        ):
-                            match_length += 1
-
-                        if match_length > best_match_length:
-                            best_match_length = match_length
-                            best_match_distance = distance
-                            # Early exit if maximum length is found
-                            if best_match_length == self.lookahead_buffer_size:
-                                break
+            position = current_position - 2
+            key = bytes(data[position : current_position + 1])
+            prev[position & self.WINDOW_MASK] = hash_table.get(key, -1)
+            hash_table[key] = position
+
+        if current_position + 2 < data_len:
+            max_length = min(self.lookahead_buffer_size, data_len - current_position)
+            # Never below 0, which also stops the walk at the -1 chain end
+            min_valid_candidate_pos = max(
+                current_position - (self.window_size - 1), 0
+            )
+            candidate_position = hash_table.get(
+                bytes(data[current_position : current_position + 3]), -1
+            )
+
+            # Walk the chain from the nearest candidate; positions only
+            # decrease, so the walk stops at the first one out of the window
+            chain_length = self.MAX_CHAIN_LENGTH
+            while candidate_position >= min_valid_candidate_pos and chain_length:
+                # Matches may not run into the current position, and the
+                # 3-byte prefix is already known to be equal
+                limit = min(max_length, current_position - candidate_position)
+                match_length = 3 if limit >= 3 else 0
+                while (
+                    match_length < limit
+                    and data[candidate_position + match_length]
+                    == data[current_position + match_length]
+                ):
+                    match_length += 1
+
+                if match_length > best_match_length:
+                    best_match_length = match_length
+                    best_match_distance = current_position - candidate_position
+                    # Early exit if maximum length is found
+                    if best_match_length == self.lookahead_buffer_size:
+                        break
+
+                candidate_position = prev[candidate_position & self.WINDOW_MASK]
+                chain_length -= 1
 
         if best_match_length >= 3:  # Only encode matches of length 3 or more
             return (best_match_distance, best_match_length)
@@ -118,15 +110,20 @@ class LZ77:
                 buf
             )  # Use memoryview instead of copying the entire buffer
 
-        output_buffer = bitarray(endian="big")
+        packed = bytearray()
+        # Tokens are packed into an integer accumulator and moved to the
+        # output whole bytes at a time instead of one bitarray per token
+        acc = 0
+        nbits = 0
         i = 0
         hash_table = {}
+        prev = array("i", [-1]) * self.MAX_WINDOW_SIZE
 
         if verbose:
             print(f"Compressing {input_file} ({len(data)} bytes)")
 
         while i < len(data):
-            max_match = self.find_match(data, i, hash_table)
+            max_match = self.find_match(data, i, hash_table, prev)
 
             if max_match:
                 (distance, length) = max_match
@@ -141,31 +138,32 @@ class LZ77:
                         f"Match at position {i}: distance={distance}, length={length}"
                     )
 
-                output_buffer.append(True)
-
-                distance_bits = bitarray(endian="big")
-                distance_bits.frombytes(bytes([(distance >> 4) & 0xFF]))
-                output_buffer.extend(distance_bits[-8:])
-
-                mixed_byte = ((distance & 0xF) << 4) | (length & 0xF)
-                mixed_bits = bitarray(endian="big")
-                mixed_bits.frombytes(bytes([mixed_byte]))
-                output_buffer.extend(mixed_bits[-8:])
+                # flag bit, 12-bit distance, 4-bit length
+                acc = (acc << 17) | (1 << 16) | (distance << 4) | (length & 0xF)
+                nbits += 17
 
                 i += length
             else:
                 if verbose:
                     print(f"Literal at position {i}: {data[i]}")
 
-                output_buffer.append(False)
-                char_bits = bitarray(endian="big")
-                char_bits.frombytes(bytes([data[i]]))
-                output_buffer.extend(char_bits[-8:])
+                # flag bit, 8-bit literal
+                acc = (acc << 9) | data[i]
+                nbits += 9
 
                 i += 1
 
-        while len(output_buffer) % 8 != 0:
-            output_buffer.append(False)
+            if nbits >= 56:
+                rest = nbits & 7
+                packed += (acc >> rest).to_bytes(nbits >> 3, "big")
+                acc &= (1 << rest) - 1
+                nbits = rest
+
+        if nbits:
+            packed += (acc << (-nbits & 7)).to_bytes((nbits + 7) >> 3, "big")
+
+        output_buffer = bitarray(endian="big")
+        output_buffer.frombytes(bytes(packed))
 
         with open(output_file, "wb") as fd:
             fd.write(struct.pack("!B", ext_len))
@@ -224,13 +222,23 @@ class LZ77:
                 distance = (dist_high << 4) | (mixed_byte >> 4)
                 length = mixed_byte & 0xF
 
-                for j in range(length):
-                    if len(output_buffer) - distance >= 0:
-                        output_buffer.append(
-                            output_buffer[len(output_buffer) - distance]
-                        )
-                    else:
-                        output_buffer.append(0)
+                start = len(output_buffer) - distance
+                if distance >= length and start >= 0:
+                    output_buffer += output_buffer[start : start + length]
+                elif start >= 0:
+                    # Overlapping match: the last distance bytes repeat
+                    repeats = length // distance + 1
+                    output_buffer += (output_buffer[start:] * repeats)[:length]
+                else:
+                    # Reference before the start of the output (corrupted
+                    # input), padded with zeros byte by byte as before
+                    for j in range(length):
+                        if len(output_buffer) - distance >= 0:
+                            output_buffer.append(
+                                output_buffer[len(output_buffer) - distance]
+                            )
+                        else:
+                            output_buffer.append(0)
 
         if output_file is None:
             base = os.path.splitext(input_file)[0]
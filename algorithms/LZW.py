@@ -11,49 +11,93 @@ class LZWCompressor:
     file_extension = ""
 
     @staticmethod
-    def compress(data: bytes):
-        """LZW compression for bytes."""
+    def compress(data: bytes) -> bytes:
+        """
+        LZW compression for bytes.
+
+        Codes are written MSB-first with a variable width: the j-th code
+        takes (256 + j).bit_length() bits, starting at 9, which is enough
+        for every code the dictionary can hold at that point.
+        """
         dict_size = 256
-        dictionary = {bytes([i]): i for i in range(dict_size)}
-        w = b""
-        result = []
-
-        for c in data:
-            wc = w + bytes([c])
-            if wc in dictionary:
-                w = wc
-            else:
-                result.append(dictionary[w])
-                dictionary[wc] = dict_size
-                dict_size += 1
-                w = bytes([c])
+        # An entry is keyed by its prefix's code and its last byte, so
+        # extending the current string is one int key instead of a bytes
+        # concatenation; codes 0-255 are the single bytes themselves
+        dictionary = {}
+        packed = bytearray()
+        acc = 0
+        nbits = 0
+
+        if not data:
+            return b""
+
+        w_code = data[0]
+        for c in data[1:]:
+            key = (w_code << 8) | c
+            code = dictionary.get(key)
+            if code is not None:
+                w_code = code
+                continue
+
+            width = dict_size.bit_length()
+            acc = (acc << width) | w_code
+            nbits += width
+            if nbits >= 56:
+                rest = nbits & 7
+                packed += (acc >> rest).to_bytes(nbits >> 3, "big")
+                acc &= (1 << rest) - 1
+                nbits = rest
 
-        if w:
-            result.append(dictionary[w])
-        return result
+            dictionary[key] = dict_size
+            dict_size += 1
+            w_code = c
+
+        width = dict_size.bit_length()
+        acc = (acc << width) | w_code
+        nbits += width
+        packed += (acc << (-nbits & 7)).to_bytes((nbits + 7) >> 3, "big")
+        return bytes(packed)
 
     @staticmethod
-    def decompress(compressed_data):
-        """LZW decompression for bytes."""
-        dict_size = 256
-        dictionary = {i: bytes([i]) for i in range(dict_size)}
+    def decompress(compressed_data: bytes) -> bytes:
+        """
+        LZW decompression for bytes.
+
+        Codes are taken straight from the bit-packed buffer as the bytes
+        are shifted in, with no separate list of codes. Every code is wider
+        than a byte, so each byte completes at most one code, and the
+        padding of the last byte never does.
+        """
+        dictionary = [bytes([i]) for i in range(256)]
         result = bytearray()
+        w = None
+        acc = 0
+        nbits = 0
+        width = 9
 
-        w = bytes([compressed_data[0]])
-        result += w
+        for byte in compressed_data:
+            acc = (acc << 8) | byte
+            nbits += 8
+            if nbits < width:
+                continue
+            nbits -= width
+            k = acc >> nbits
+            acc &= (1 << nbits) - 1
 
-        for k in compressed_data[1:]:
-            if k in dictionary:
+            dict_size = len(dictionary)
+            if k < dict_size:
                 entry = dictionary[k]
-            elif k == dict_size:
+            elif k == dict_size and w is not None:
                 entry = w + w[:1]
             else:
                 raise ValueError("Bad compressed k: %s" % k)
 
             result += entry
-            dictionary[dict_size] = w + entry[:1]
-            dict_size += 1
+            if w is not None:
+                dictionary.append(w + entry[:1])
             w = entry
+            # The encoder is one entry ahead when it writes the next code
+            width = (len(dictionary) + 1).bit_length()
 
         return bytes(result)
 
@@ -64,17 +108,14 @@ class LZWCompressor:
             data = f.read()
         compressed = LZWCompressor.compress(data)
         with open(output_path, "wb") as f:
-            for num in compressed:
-                f.write(num.to_bytes(4, byteorder="big"))
+            f.write(compressed)
         LZWCompressor.file_extension = input_path.split(".")[-1]
 
     @staticmethod
     def decompress_file(input_path: str = "compressed_lzw.bin"):
         """Decompress a binary file using LZW and save it."""
         with open(input_path, "rb") as f:
-            compressed = []
-            while byte := f.read(4):
-                compressed.append(int.from_bytes(byte, byteorder="big"))
+            compressed = f.read()
         decompressed = LZWCompressor.decompress(compressed)
         if LZWCompressor.file_extension == "":
             raise ValueError("File extension not set. Please compress a file first.")
@@ -1,81 +1,430 @@
+import functools
+import mmap
 import os
-
-from bitarray import bitarray
+from array import array
+from collections import Counter, deque
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
 
 from algorithms.deflate_utils.bit_reader import BitReader
 from algorithms.deflate_utils.bit_writer import BitWriter
 from algorithms.deflate_utils.LZ77_deflate import LZ77
+from algorithms.huffman_coding import sorted_code_lengths
+
+# Code lengths of the fixed Huffman trees (RFC 1951, section 3.2.6), kept
+# as byte arrays rather than lists of boxed ints
+FIXED_LIT_LEN_LENGTHS = array("B", [8] * 144 + [9] * 112 + [7] * 24 + [8] * 8)
+FIXED_DIST_LENGTHS = array("B", [5] * 32)
+
+# Order in which the code-length code lengths are stored (RFC 1951, 3.2.7),
+# and the extra-bit count and shortest repeat of each code-length symbol
+# (16, 17, 18 repeat)
+CODE_LENGTH_ORDER = (16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2, 14, 1, 15)
+CODE_LENGTH_EXTRA_BITS = (0,) * 16 + (2, 3, 7)
+CODE_LENGTH_REPEAT_BASE = (0,) * 16 + (3, 3, 11)
+
+# Blocks of at most this many symbols always use the fixed codes; the
+# dynamic tree header rarely pays for itself below that
+FIXED_BLOCK_MAX_SYMBOLS = 32
+
+
+def _canonical_tree(lengths: Sequence[int]) -> tuple[array, array, array]:
+    """
+    Describe the canonical Huffman code for a list of code lengths.
+
+    The code is stored as flat arrays, as in zlib's inflate: the codes of
+    length L are first_codes[L], first_codes[L] + 1, ... and belong to the
+    next counts[L] entries of symbols.
+
+    Args:
+        lengths: Code length of every symbol (0 for unused symbols)
+
+    Returns:
+        Tuple of (counts, symbols, first_codes); counts and first_codes
+        are indexed by code length 0-15, symbols is in canonical order
+    """
+    counts = array("H", bytes(2 * 16))
+    for length in lengths:
+        counts[length] += 1
+    counts[0] = 0
+
+    ordered = sorted(
+        (length, symbol) for symbol, length in enumerate(lengths) if length > 0
+    )
+    symbols = array("H", [symbol for _, symbol in ordered])
+
+    first_codes = array("H", bytes(2 * 16))
+    code = 0
+    for length in range(1, 16):
+        code = (code + counts[length - 1]) << 1
+        first_codes[length] = code
+
+    return counts, symbols, first_codes
+
+
+def _huffman_code_lengths(freqs: Sequence[int], max_length: int) -> array:
+    """
+    Compute Huffman code lengths for symbol frequencies, limited to
+    max_length bits. If the optimal tree is too deep, the frequencies are
+    halved (keeping every used symbol at least 1) and the lengths rebuilt.
+
+    Args:
+        freqs: Frequency of every symbol (0 for unused symbols)
+        max_length: Longest code length allowed
+
+    Returns:
+        Array of code lengths indexed by symbol, 0 for unused symbols
+    """
+    # Used symbols in ascending frequency order; their lengths come out
+    # of sorted_code_lengths in the same order
+    used = sorted(
+        (symbol for symbol, freq in enumerate(freqs) if freq), key=freqs.__getitem__
+    )
+    weights = [freqs[symbol] for symbol in used]
+    # A tree with no used symbols, e.g. the distance tree of a block
+    # without matches, gets no codes at all
+    if not used:
+        return array("B", bytes(len(freqs)))
+
+    while True:
+        lengths = array("B", bytes(len(freqs)))
+        if len(used) == 1:
+            lengths[used[0]] = 1
+            return lengths
+
+        for symbol, length in zip(used, sorted_code_lengths(weights)):
+            lengths[symbol] = length
+
+        if max(lengths, default=0) <= max_length:
+            return lengths
+        weights = [(weight + 1) >> 1 for weight in weights]
+
+
+def _run_length_code_lengths(lengths: Sequence[int]) -> list[tuple[int, int]]:
+    """
+    Encode a sequence of code lengths with the code-length alphabet:
+    0-15 are literal lengths, 16 repeats the previous length 3-6 times,
+    17 and 18 repeat zero 3-10 and 11-138 times.
+
+    Args:
+        lengths: Literal/length code lengths followed by distance ones
+
+    Returns:
+        List of (code-length symbol, extra-bit value) pairs
+    """
+    encoded = []
+    for length, group in groupby(lengths):
+        run = len(list(group))
+        if length == 0:
+            while run >= 11:
+                step = min(run, 138)
+                encoded.append((18, step - 11))
+                run -= step
+            if run >= 3:
+                encoded.append((17, run - 3))
+                run = 0
+        else:
+            encoded.append((length, 0))
+            run -= 1
+            while run >= 3:
+                step = min(run, 6)
+                encoded.append((16, step - 3))
+                run -= step
+        encoded.extend([(length, 0)] * run)
+    return encoded
+
+
+def _code_table(lengths: Sequence[int], allow_unused: bool = False) -> array:
+    """
+    Precompute the canonical code of every symbol as a packed integer.
+
+    Args:
+        lengths: Code length of every symbol
+        allow_unused: Whether symbols with length 0 (no code) are allowed;
+            their entries are left 0
+
+    Returns:
+        Array indexed by symbol holding (code << 5) | code_length
+    """
+    counts, symbols, first_codes = _canonical_tree(lengths)
+    packed = array("I", bytes(4 * len(lengths)))
+    index = 0
+    for length in range(1, 16):
+        for code in range(first_codes[length], first_codes[length] + counts[length]):
+            packed[symbols[index]] = (code << 5) | length
+            index += 1
+    if not allow_unused and 0 in packed:
+        missing = [symbol for symbol, entry in enumerate(packed) if not entry]
+        raise ValueError(f"Symbols {missing} have no Huffman code")
+    return packed
+
+
+# Fixed-tree emission never changes, so the per-symbol codes are built once
+FIXED_LIT_LEN_CODES = _code_table(FIXED_LIT_LEN_LENGTHS)
+FIXED_DIST_CODES = _code_table(FIXED_DIST_LENGTHS)
+
+# Extra bits are stored LSB-first; REVERSED_EXTRA_BITS[n][v] is the n-bit
+# value v in stream (MSB-first) order, for every extra-bit count up to 13
+REVERSED_EXTRA_BITS = tuple(
+    tuple(int(format(v, f"0{n}b")[::-1], 2) if n else 0 for v in range(1 << n))
+    for n in range(14)
+)
+
+
+def _base_table(
+    code_table: list[tuple[int, int, int]], size: int
+) -> tuple[array, array]:
+    """
+    Index (code, base, extra_bits) rows by code for O(1) decoding.
+
+    Args:
+        code_table: Rows of (code, base value, extra-bit count)
+        size: Number of slots, one past the largest code
+
+    Returns:
+        Tuple of (bases, extra_bits) arrays
+    """
+    bases = array("H", bytes(2 * size))
+    extra_bits = array("B", bytes(size))
+    for code, base, extra in code_table:
+        bases[code] = base
+        extra_bits[code] = extra
+    return bases, extra_bits
+
+
+# Match decoding looks up base and extra bits by code instead of scanning
+LENGTH_BASE, LENGTH_EXTRA_BITS = _base_table(LZ77._length_table, 286)
+DIST_BASE, DIST_EXTRA_BITS = _base_table(LZ77._distance_table, 30)
+
+
+def _code_with_extra_table(codes: array, extra_bits: array) -> tuple[array, ...]:
+    """
+    Fold each symbol's extra bits into its Huffman code ahead of time.
+
+    Args:
+        codes: Packed (code << 5) | code_length of every symbol
+        extra_bits: Extra-bit count of every symbol that takes extra bits
+
+    Returns:
+        Tuple indexed by symbol of arrays indexed by extra-bit value, each
+        entry holding the code followed by the reversed extra bits, packed
+        as (bits << 5) | total_length; symbols without a code get an
+        empty array
+    """
+    table = []
+    for symbol, packed in enumerate(codes):
+        if not packed:
+            table.append(array("I"))
+            continue
+        n = extra_bits[symbol] if symbol < len(extra_bits) else 0
+        code, length = packed >> 5, packed & 0x1F
+        table.append(
+            array(
+                "I",
+                [
+                    (((code << n) | reversed_bits) << 5) | (length + n)
+                    for reversed_bits in REVERSED_EXTRA_BITS[n]
+                ],
+            )
+        )
+    return tuple(table)
 
 
-class Deflate:
-    def __init__(self, window_size: int | None = None) -> None:
-        """
-        Initialize the Deflate compression algorithm.
+# A literal/length or distance symbol plus its extra bits is one lookup
+FIXED_LIT_LEN_EXTRA_CODES = _code_with_extra_table(
+    FIXED_LIT_LEN_CODES, LENGTH_EXTRA_BITS
+)
+FIXED_DIST_EXTRA_CODES = _code_with_extra_table(FIXED_DIST_CODES, DIST_EXTRA_BITS)
 
-        Args:
-            window_size: Optional window size for LZ77 compression
-        """
-        self.lz77 = LZ77(window_size=window_size)
-        # Initialize static Huffman encoding maps
-        self._fixed_lit_len_codes = self._get_fixed_lit_len_encoding_map()
-        self._fixed_dist_codes = self._get_fixed_dist_encoding_map()
 
-    @staticmethod
-    def _get_fixed_lit_len_encoding_map() -> dict[int, tuple[int, int]]:
-        """
-        Generate canonical Huffman codes for fixed literal/length tree.
+def _dynamic_tree_header(
+    lit_len_lengths: Sequence[int], dist_lengths: Sequence[int]
+) -> tuple[int, int]:
+    """
+    Build the tree description of a dynamic block: HLIT, HDIST, HCLEN,
+    the code-length code lengths and the run-length coded code lengths.
 
-        Returns:
-            Dictionary mapping symbols to their (code, code_length) tuples
-        """
-        lengths = [8] * 144 + [9] * 112 + [7] * 24 + [8] * 8
-        full_lengths = {i: length for i, length in enumerate(lengths)}
-        full_lengths[256] = 7
+    Args:
+        lit_len_lengths: Code length of every literal/length symbol
+        dist_lengths: Code length of every distance code
 
-        symbols_with_lengths = sorted(
-            [(symbol, length) for symbol, length in full_lengths.items() if length > 0],
-            key=lambda x: (x[1], x[0]),
-        )
+    Returns:
+        Tuple of (bits, bit_count) in stream order
+    """
+    hlit = max(
+        257, max((s for s, n in enumerate(lit_len_lengths) if n), default=0) + 1
+    )
+    hdist = max(1, max((s for s, n in enumerate(dist_lengths) if n), default=0) + 1)
+    encoded = _run_length_code_lengths(
+        list(lit_len_lengths[:hlit]) + list(dist_lengths[:hdist])
+    )
 
-        encoding_map = {}
-        current_code = 0
-        current_length = symbols_with_lengths[0][1] if symbols_with_lengths else 0
+    cl_freqs = [0] * 19
+    for symbol, _ in encoded:
+        cl_freqs[symbol] += 1
+    cl_lengths = _huffman_code_lengths(cl_freqs, 7)
+    cl_codes = _code_table(cl_lengths, allow_unused=True)
+    hclen = 19
+    while hclen > 4 and cl_lengths[CODE_LENGTH_ORDER[hclen - 1]] == 0:
+        hclen -= 1
+
+    # Header fields and repeat counts are LSB-first, codes MSB-first
+    reversed_bits = REVERSED_EXTRA_BITS
+    acc = (
+        (reversed_bits[5][hlit - 257] << 9)
+        | (reversed_bits[5][hdist - 1] << 4)
+        | reversed_bits[4][hclen - 4]
+    )
+    nbits = 14
+    for symbol in CODE_LENGTH_ORDER[:hclen]:
+        acc = (acc << 3) | reversed_bits[3][cl_lengths[symbol]]
+        nbits += 3
+    for symbol, extra in encoded:
+        packed = cl_codes[symbol]
+        n = CODE_LENGTH_EXTRA_BITS[symbol]
+        acc = (acc << (packed & 0x1F)) | (packed >> 5)
+        acc = (acc << n) | reversed_bits[n][extra]
+        nbits += (packed & 0x1F) + n
+    return acc, nbits
+
+
+def _encode_block(block: dict, is_final: bool) -> BitWriter:
+    """
+    Encode one block with whichever of the fixed Huffman codes or codes
+    built from the block's own symbol frequencies (BTYPE=10) is smaller.
+
+    Args:
+        block: Dictionary with the block's symbols, length extra bits,
+            distance codes and distance extra bits
+        is_final: Whether to set the block's BFINAL bit
+
+    Returns:
+        BitWriter holding the block's bits, not byte-aligned
+
+    Raises:
+        ValueError: If a symbol or distance code is out of range
+    """
+    # Range-check the whole block once so the loop can index blindly
+    top_symbol = max(block["symbols"], default=0)
+    if top_symbol >= 286:
+        raise ValueError(f"Invalid literal/length symbol {top_symbol}")
+    top_dcode = max(block["distances"], default=0)
+    if top_dcode >= 30:
+        raise ValueError(f"Invalid distance code {top_dcode}")
+
+    # Tiny blocks skip the frequency count and tree construction
+    if len(block["symbols"]) <= FIXED_BLOCK_MAX_SYMBOLS:
+        return _emit_block(
+            block,
+            FIXED_LIT_LEN_EXTRA_CODES,
+            FIXED_DIST_EXTRA_CODES,
+            (int(is_final) << 2) | 0b10,
+            3,
+        )
 
-        for symbol, length in symbols_with_lengths:
-            current_code <<= length - current_length
-            encoding_map[symbol] = (current_code, length)
-            current_code += 1
-            current_length = length
+    lit_len_freqs = [0] * 286
+    for symbol, freq in Counter(block["symbols"]).items():
+        lit_len_freqs[symbol] = freq
+    dist_freqs = [0] * 30
+    for dcode, freq in Counter(block["distances"]).items():
+        dist_freqs[dcode] = freq
+
+    lit_len_lengths = _huffman_code_lengths(lit_len_freqs, 15)
+    dist_lengths = _huffman_code_lengths(dist_freqs, 15)
+    header, header_bits = _dynamic_tree_header(lit_len_lengths, dist_lengths)
+
+    # Extra bits cost the same either way, so only the codes are compared
+    fixed_bits = sum(map(int.__mul__, lit_len_freqs, FIXED_LIT_LEN_LENGTHS))
+    fixed_bits += 5 * len(block["distances"])
+    dynamic_bits = header_bits
+    dynamic_bits += sum(map(int.__mul__, lit_len_freqs, lit_len_lengths))
+    dynamic_bits += sum(map(int.__mul__, dist_freqs, dist_lengths))
+
+    # The accumulator starts with the 3-bit block header: BFINAL, then
+    # BTYPE LSB-first (01 fixed, 10 dynamic)
+    if dynamic_bits < fixed_bits:
+        lit_len_codes = _code_with_extra_table(
+            _code_table(lit_len_lengths, allow_unused=True), LENGTH_EXTRA_BITS
+        )
+        dist_codes = _code_with_extra_table(
+            _code_table(dist_lengths, allow_unused=True), DIST_EXTRA_BITS
+        )
+        acc = (((int(is_final) << 2) | 0b01) << header_bits) | header
+        nbits = 3 + header_bits
+    else:
+        lit_len_codes = FIXED_LIT_LEN_EXTRA_CODES
+        dist_codes = FIXED_DIST_EXTRA_CODES
+        acc = (int(is_final) << 2) | 0b10
+        nbits = 3
+    return _emit_block(block, lit_len_codes, dist_codes, acc, nbits)
+
+
+def _emit_block(
+    block: dict,
+    lit_len_codes: tuple,
+    dist_codes: tuple,
+    acc: int,
+    nbits: int,
+) -> BitWriter:
+    """
+    Append a block's symbols to the bits already in an accumulator.
+
+    Args:
+        block: Dictionary with the block's symbols, length extra bits,
+            distance codes and distance extra bits
+        lit_len_codes: Literal/length codes joined with their extra bits,
+            as built by _code_with_extra_table
+        dist_codes: Distance codes joined with their extra bits
+        acc: Accumulator holding the block header
+        nbits: Number of bits in acc
+
+    Returns:
+        BitWriter holding the block's bits, not byte-aligned
+    """
+    # next() on a zip measured faster here than an index cursor into the
+    # two distance arrays or a pre-gathered list of distance codes
+    match_iter = zip(block["distances"], block["dist_extra"])
+
+    # Codes and extra bits are packed into a local accumulator; whole
+    # bytes are moved to `out` once at least 56 bits are pending
+    out = bytearray()
+
+    # Each symbol is appended together with its extra bits in one step
+    for sym, eb in zip(block["symbols"], block["length_extra"]):
+        packed = lit_len_codes[sym][eb >> 4]
+        acc = (acc << (packed & 0x1F)) | (packed >> 5)
+        nbits += packed & 0x1F
+
+        # Symbols were range-checked by _encode_block, so a single
+        # comparison is enough to pick out length codes
+        if sym > 256:
+            dcode, eb_d = next(match_iter)
+            packed = dist_codes[dcode][eb_d >> 4]
+            acc = (acc << (packed & 0x1F)) | (packed >> 5)
+            nbits += packed & 0x1F
+
+        if nbits >= 56:
+            rest = nbits & 7
+            out += (acc >> rest).to_bytes(nbits >> 3, "big")
+            acc &= (1 << rest) - 1
+            nbits = rest
+
+    writer = BitWriter()
+    writer.write_packed_bytes(out)
+    writer.write_bits_msb(acc, nbits)
+    return writer
 
-        return encoding_map
 
-    @staticmethod
-    def _get_fixed_dist_encoding_map() -> dict[int, tuple[int, int]]:
+class Deflate:
+    def __init__(self, window_size: int | None = None) -> None:
         """
-        Generate canonical Huffman codes for fixed distance tree.
+        Initialize the Deflate compression algorithm.
 
-        Returns:
-            Dictionary mapping symbols to their (code, code_length) tuples
+        Args:
+            window_size: Optional window size for LZ77 compression
         """
-        lengths = [5] * 32
-        full_lengths = {i: length for i, length in enumerate(lengths)}
-
-        symbols_with_lengths = sorted(
-            [(symbol, length) for symbol, length in full_lengths.items() if length > 0],
-            key=lambda x: (x[1], x[0]),
-        )
-
-        encoding_map = {}
-        current_code = 0
-        current_length = symbols_with_lengths[0][1] if symbols_with_lengths else 0
-
-        for symbol, length in symbols_with_lengths:
-            current_code <<= length - current_length
-            encoding_map[symbol] = (current_code, length)
-            current_code += 1
-            current_length = length
-
-        return encoding_map
+        self.lz77 = LZ77(window_size=window_size)
 
     def compress_file(
         self,
@@ -83,7 +432,8 @@ class Deflate:
         output_file: str = "compressed_deflate.bin",
         verbose: bool = False,
         bfinal: int = 1,
-    ) -> bitarray:
+        workers: int | None = None,
+    ) -> int:
         """
         Compress a file using the DEFLATE algorithm.
 
@@ -92,9 +442,11 @@ class Deflate:
             output_file: Path to the output file
             verbose: Whether to print debug information
             bfinal: Whether this is the final block
+            workers: Number of processes used to encode blocks; None or 1
+                encodes them in the current process
 
         Returns:
-            The compressed data as a bitarray
+            Size of the compressed file in bytes
         """
         if output_file is None:
             output_file = os.path.splitext(input_file)[0] + ".bin"
@@ -105,35 +457,13 @@ class Deflate:
         ext_bytes = ext.encode("utf-8")
         ext_len = len(ext_bytes)
 
-        symbol_list, length_extra_bits, distance_list, distance_extra_bits = (
-            self.lz77.compress(input_file, verbose=verbose, deflate=True)
-        )
-
-        debug_tuples = []
-        dist_idx = 0
-        dist_extra_idx = 0
-        for i in range(20):
-            if i < len(symbol_list):
-                sym = symbol_list[i]
-                len_extra = length_extra_bits[i] if i < len(length_extra_bits) else None
-                if 257 <= sym <= 285:
-                    dist = (
-                        distance_list[dist_idx]
-                        if dist_idx < len(distance_list)
-                        else None
-                    )
-                    dist_extra = (
-                        distance_extra_bits[dist_extra_idx]
-                        if dist_extra_idx < len(distance_extra_bits)
-                        else None
-                    )
-                    debug_tuples.append((sym, len_extra, dist, dist_extra))
-                    dist_idx += 1
-                    dist_extra_idx += 1
-                else:
-                    debug_tuples.append((sym, len_extra))
-            else:
-                debug_tuples.append(None)
+        # LZ77 reads the memory-mapped file in place instead of a copy
+        with open(input_file, "rb") as f, mmap.mmap(
+            f.fileno(), length=0, access=mmap.ACCESS_READ
+        ) as data:
+            symbol_list, length_extra_bits, distance_list, distance_extra_bits = (
+                self.lz77.tokenize(data, verbose=verbose)
+            )
 
         if verbose:
             print(f"LZ77+Mapping produced:")
@@ -144,104 +474,83 @@ class Deflate:
 
         BLOCK_SIZE = 16384
         blocks = []
-        current_block = {
-            "symbols": [],
-            "length_extra": [],
-            "distances": [],
-            "dist_extra": [],
-        }
-        dist_list_idx = 0
-        dist_extra_idx = 0
-
-        for i in range(len(symbol_list)):
-            sym = symbol_list[i]
-            len_extra = length_extra_bits[i]
-
-            current_block["symbols"].append(sym)
-            current_block["length_extra"].append(len_extra)
-
-            if 257 <= sym <= 285:
-                if dist_list_idx < len(distance_list):
-                    current_block["distances"].append(distance_list[dist_list_idx])
-                    dist_list_idx += 1
-                else:
-                    raise IndexError(
-                        "Mismatch between length codes and distance list length"
-                    )
-
-                if dist_extra_idx < len(distance_extra_bits):
-                    current_block["dist_extra"].append(
-                        distance_extra_bits[dist_extra_idx]
-                    )
-                    dist_extra_idx += 1
-                else:
-                    raise IndexError(
-                        "Mismatch between length codes and distance extra bits length"
-                    )
-
-            if len(current_block["symbols"]) >= BLOCK_SIZE or i == len(symbol_list) - 1:
-                current_block["symbols"].append(256)
-                current_block["length_extra"].append((0, 0))
-
-                blocks.append(current_block)
-
-                if i < len(symbol_list) - 1:
-                    current_block = {
-                        "symbols": [],
-                        "length_extra": [],
-                        "distances": [],
-                        "dist_extra": [],
-                    }
-                else:
-                    current_block = None
-
-        writer = BitWriter()
-
-        # Write file extension header
-        writer.write_bits_lsb(ext_len, 8)  # Write extension length
-        for byte in ext_bytes:
-            writer.write_bits_lsb(byte, 8)  # Write extension bytes
-
-        for block_index, block in enumerate(blocks):
-            is_final = bfinal == 1 and block_index == len(blocks) - 1
-
-            writer.write_bits_lsb(is_final, 1)
-            writer.write_bits_lsb(1, 2)
-
-            dist_iter = iter(block["distances"])
-            len_eb_iter = iter(block["length_extra"])
-            dist_eb_iter = iter(block["dist_extra"])
-
-            for sym in block["symbols"]:
-                if sym not in self._fixed_lit_len_codes:
-                    raise ValueError(
-                        f"Symbol {sym} not found in FIXED Huffman lit/len tree"
-                    )
-                bits, length = self._fixed_lit_len_codes[sym]
-                writer.write_bits_msb(bits, length)
-
-                eb_cnt, eb_val = next(len_eb_iter)
-                if eb_cnt > 0:
-                    writer.write_bits_lsb(eb_val, eb_cnt)
-
-                if 257 <= sym <= 285:
-                    dcode = next(dist_iter)
-                    if dcode not in self._fixed_dist_codes:
-                        raise ValueError(
-                            f"Distance code {dcode} not found in FIXED Huffman dist tree"
+        dist_start = 0
+
+        # Every block is a plain slice of the LZ77 output; the distance
+        # lists advance by the number of length codes in that slice
+        for start in range(0, len(symbol_list), BLOCK_SIZE):
+            symbols = symbol_list[start : start + BLOCK_SIZE]
+            length_extra = length_extra_bits[start : start + BLOCK_SIZE]
+            dist_end = dist_start + sum(map((256).__lt__, symbols))
+
+            if dist_end > len(distance_list):
+                raise IndexError(
+                    "Mismatch between length codes and distance list length"
+                )
+            if dist_end > len(distance_extra_bits):
+                raise IndexError(
+                    "Mismatch between length codes and distance extra bits length"
+                )
+
+            symbols.append(256)
+            length_extra.append(0)
+            blocks.append(
+                {
+                    "symbols": symbols,
+                    "length_extra": length_extra,
+                    "distances": distance_list[dist_start:dist_end],
+                    "dist_extra": distance_extra_bits[dist_start:dist_end],
+                }
+            )
+            dist_start = dist_end
+
+        # Completed bytes go to the file after every block, so the writer
+        # only ever holds one block; codes take at most 20 bits per
+        # literal/length symbol plus 28 per distance
+        writer = BitWriter(initial_capacity=(20 + 28) * BLOCK_SIZE // 8 + 512)
+
+        with open(output_file, "wb") as out:
+            # Write file extension header
+            writer.write_bits_lsb(ext_len, 8)  # Write extension length
+            for byte in ext_bytes:
+                writer.write_bits_lsb(byte, 8)  # Write extension bytes
+
+            if workers is not None and workers > 1 and len(blocks) > 1:
+                # Blocks are independent once split, so they can be encoded
+                # in separate processes and concatenated in order
+                final_flags = [
+                    bfinal == 1 and index == len(blocks) - 1
+                    for index in range(len(blocks))
+                ]
+                # At most 2 * workers blocks are in flight, so encoded
+                # blocks are written as they finish instead of piling up
+                # in memory behind a slow one
+                pending = deque()
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for block, is_final in zip(blocks, final_flags):
+                        if len(pending) >= 2 * workers:
+                            writer.extend(pending.popleft().result())
+                            writer.flush_completed_bytes(out)
+                        pending.append(
+                            executor.submit(_encode_block, block, is_final)
                         )
-                    dbits, dlen = self._fixed_dist_codes[dcode]
-                    writer.write_bits_msb(dbits, dlen)
+                    while pending:
+                        writer.extend(pending.popleft().result())
+                        writer.flush_completed_bytes(out)
+            else:
+                for block_index, block in enumerate(blocks):
+                    is_final = bfinal == 1 and block_index == len(blocks) - 1
+                    writer.extend(_encode_block(block, is_final))
+                    writer.flush_completed_bytes(out)
 
-                    eb_cnt_d, eb_val_d = next(dist_eb_iter)
-                    if eb_cnt_d > 0:
-                        writer.write_bits_lsb(eb_val_d, eb_cnt_d)
+            writer.byte_align()
+            writer.flush_completed_bytes(out)
+            compressed_size = out.tell()
 
-        writer.flush_to_file(output_file)
         if verbose:
-            print(f"Written DEFLATE output (using fixed trees) to {output_file}")
+            print(f"Written DEFLATE output to {output_file}")
 
-        return writer.get_bitarray()
+        return compressed_size
 
     def decompress_file(
         self,
@@ -288,19 +597,16 @@ class Deflate:
 
                 if btype == 0:
                     if verbose:
-                        print("Skipping uncompressed block (BTYPE=00)")
+                        print("Copying uncompressed block (BTYPE=00)")
                     reader.byte_align()
                     len_bytes = reader.read_bits_lsb(16)
                     nlen_bytes = reader.read_bits_lsb(16)
-                    for _ in range(len_bytes):
-                        reader.read_bits_lsb(8)
+                    decoded_data += reader.read_bytes(len_bytes)
                 elif btype == 1:
                     self._decompress_fixed_huffman_block(reader, decoded_data, verbose)
                 elif btype == 2:
-                    if verbose:
-                        print("Skipping dynamic Huffman block (BTYPE=10)")
-                    raise ValueError(
-                        "Dynamic Huffman blocks (BTYPE=10) are not supported"
+                    self._decompress_dynamic_huffman_block(
+                        reader, decoded_data, verbose
                     )
                 else:
                     raise ValueError(f"Unknown block type: {btype}")
@@ -339,11 +645,69 @@ class Deflate:
             reader, lit_len_tree, dist_tree, output_buffer, verbose
         )
 
+    def _decompress_dynamic_huffman_block(
+        self, reader: BitReader, output_buffer: bytearray, verbose: bool
+    ) -> None:
+        """
+        Decompress a block using dynamic Huffman encoding.
+
+        Args:
+            reader: BitReader instance for reading compressed data
+            output_buffer: Buffer to store decompressed data
+            verbose: Whether to print debug information
+
+        Raises:
+            ValueError: If the tree description is invalid
+        """
+        hlit = reader.read_bits_lsb(5) + 257
+        hdist = reader.read_bits_lsb(5) + 1
+        hclen = reader.read_bits_lsb(4) + 4
+
+        cl_lengths = [0] * 19
+        for symbol in CODE_LENGTH_ORDER[:hclen]:
+            cl_lengths[symbol] = reader.read_bits_lsb(3)
+        cl_tree = self._build_decode_table(cl_lengths)
+
+        # Lengths are written by index into one preallocated byte array;
+        # zero runs are already in place and only need skipping
+        total = hlit + hdist
+        lengths = array("B", bytes(total))
+        i = 0
+        while i < total:
+            symbol = self._decode_huffman_symbol(reader, cl_tree)
+            if symbol is None:
+                raise ValueError("Truncated code length sequence")
+            if symbol < 16:
+                lengths[i] = symbol
+                i += 1
+                continue
+            count = CODE_LENGTH_REPEAT_BASE[symbol] + reader.read_bits_lsb(
+                CODE_LENGTH_EXTRA_BITS[symbol]
+            )
+            if i + count > total:
+                raise ValueError("Code length repeat overruns the tree description")
+            if symbol == 16:
+                if i == 0:
+                    raise ValueError("Repeat code 16 with no previous length")
+                lengths[i : i + count] = array("B", [lengths[i - 1]]) * count
+            i += count
+
+        if verbose:
+            print(f"Dynamic trees: HLIT={hlit}, HDIST={hdist}, HCLEN={hclen}")
+
+        self._decode_huffman_data(
+            reader,
+            self._build_decode_table(lengths[:hlit]),
+            self._build_decode_table(lengths[hlit:]),
+            output_buffer,
+            verbose,
+        )
+
     def _decode_huffman_data(
         self,
         reader: BitReader,
-        lit_len_tree: dict,
-        dist_tree: dict,
+        lit_len_tree: tuple[array, int],
+        dist_tree: tuple[array, int],
         output_buffer: bytearray,
         verbose: bool,
     ) -> None:
@@ -352,25 +716,24 @@ class Deflate:
 
         Args:
             reader: BitReader instance for reading compressed data
-            lit_len_tree: Huffman tree for literals and lengths
-            dist_tree: Huffman tree for distances
+            lit_len_tree: Decode table for literals and lengths
+            dist_tree: Decode table for distances
             output_buffer: Buffer to store decompressed data
             verbose: Whether to print debug information
         """
+        literals = 0
+        matches = 0
+        end_marker = False
+
         while True:
-            symbol = self._decode_huffman_symbol(reader, lit_len_tree)
+            size_before = len(output_buffer)
+            symbol = self._decode_literal_run(reader, lit_len_tree, output_buffer)
+            literals += len(output_buffer) - size_before
             if symbol is None:
-                if verbose:
-                    print("End of block reached")
                 break
 
-            if symbol < 256:
-                output_buffer.append(symbol)
-                if verbose:
-                    print(f"Literal: {symbol} ({chr(symbol)})")
-            elif symbol == 256:
-                if verbose:
-                    print("End of block marker found")
+            if symbol == 256:
+                end_marker = True
                 break
             else:
                 length = self._decode_length(reader, symbol)
@@ -390,47 +753,81 @@ class Deflate:
                         f"Invalid distance {distance} exceeds buffer size {len(output_buffer)}"
                     )
 
-                if verbose:
-                    print(f"Match: length={length}, distance={distance}")
+                matches += 1
+                start = len(output_buffer) - distance
+                if distance >= length:
+                    output_buffer += output_buffer[start : start + length]
+                else:
+                    # Overlapping match: the last `distance` bytes repeat
+                    chunk = output_buffer[start:]
+                    repeats, remainder = divmod(length, distance)
+                    output_buffer += chunk * repeats + chunk[:remainder]
 
-                for i in range(length):
-                    if distance > len(output_buffer):
-                        raise ValueError(
-                            f"Distance {distance} exceeds buffer size {len(output_buffer)}"
-                        )
-                    output_buffer.append(output_buffer[-distance])
+        if verbose:
+            ending = "end of block marker" if end_marker else "end of data"
+            print(f"Block decoded: {literals} literals, {matches} matches ({ending})")
 
-    def _decode_huffman_symbol(self, reader: BitReader, tree: dict) -> int | None:
+    def _decode_literal_run(
+        self, reader: BitReader, tree: tuple[array, int], output_buffer: bytearray
+    ) -> int | None:
         """
-        Decode a single symbol using a Huffman tree.
+        Decode literals straight into the output until a non-literal symbol.
 
         Args:
             reader: BitReader instance for reading compressed data
-            tree: Huffman tree for decoding
+            tree: Decode table for literals and lengths
+            output_buffer: Buffer the literals are appended to
 
         Returns:
-            Decoded symbol or None if end of data
+            The end-of-block or length symbol that stopped the run, or None
+            if end of data
         """
-        code = 0
-        code_len = 0
-        max_code_len = max(length for length, _ in tree.keys()) if tree else 0
+        table, max_code_len = tree
+        if max_code_len == 0:
+            return None
 
-        while code_len <= max_code_len:
-            try:
-                bit = reader.read_bit()
-            except EOFError:
+        peek_bits_msb = reader.peek_bits_msb
+        consume = reader.consume
+        append = output_buffer.append
+        available = reader.bits_remaining()
+
+        while True:
+            entry = table[peek_bits_msb(max_code_len)]
+            code_len = entry & 0xF
+            if code_len == 0 or code_len > available:
                 return None
 
-            code = (code << 1) | bit
-            code_len += 1
+            consume(code_len)
+            available -= code_len
+            symbol = entry >> 4
+            if symbol >= 256:
+                return symbol
+            append(symbol)
 
-            if (code_len, code) in tree:
-                return tree[(code_len, code)]
+    def _decode_huffman_symbol(
+        self, reader: BitReader, tree: tuple[array, int]
+    ) -> int | None:
+        """
+        Decode a single symbol with one lookup in a Huffman decode table.
 
-            if code_len == max_code_len:
-                return None
+        Args:
+            reader: BitReader instance for reading compressed data
+            tree: Decode table and its index width in bits
 
-        return None
+        Returns:
+            Decoded symbol or None if end of data
+        """
+        table, max_code_len = tree
+        if max_code_len == 0:
+            return None
+
+        entry = table[reader.peek_bits_msb(max_code_len)]
+        code_len = entry & 0xF
+        if code_len == 0 or code_len > reader.bits_remaining():
+            return None
+
+        reader.consume(code_len)
+        return entry >> 4
 
     def _decode_length(self, reader: BitReader, length_code: int) -> int | None:
         """
@@ -446,14 +843,10 @@ class Deflate:
         if length_code < 257 or length_code > 285:
             return None
 
-        for code, base_len, extra_bits in LZ77._length_table:
-            if code == length_code:
-                if extra_bits > 0:
-                    extra = reader.read_bits_lsb(extra_bits)
-                    return base_len + extra
-                return base_len
-
-        return None
+        extra_bits = LENGTH_EXTRA_BITS[length_code]
+        if extra_bits > 0:
+            return LENGTH_BASE[length_code] + reader.read_bits_lsb(extra_bits)
+        return LENGTH_BASE[length_code]
 
     def _decode_distance(self, reader: BitReader, distance_code: int) -> int | None:
         """
@@ -469,76 +862,76 @@ class Deflate:
         if distance_code < 0 or distance_code > 29:
             return None
 
-        for code, base_dist, extra_bits in LZ77._distance_table:
-            if code == distance_code:
-                if extra_bits > 0:
-                    try:
-                        extra = reader.read_bits_lsb(extra_bits)
-                        distance = base_dist + extra
-                        if distance > LZ77.MAX_WINDOW_SIZE:
-                            raise ValueError(
-                                f"Distance {distance} exceeds maximum window size {LZ77.MAX_WINDOW_SIZE}"
-                            )
-                        return distance
-                    except EOFError:
-                        return base_dist
+        base_dist = DIST_BASE[distance_code]
+        extra_bits = DIST_EXTRA_BITS[distance_code]
+        if extra_bits > 0:
+            try:
+                distance = base_dist + reader.read_bits_lsb(extra_bits)
+                if distance > LZ77.MAX_WINDOW_SIZE:
+                    raise ValueError(
+                        f"Distance {distance} exceeds maximum window size {LZ77.MAX_WINDOW_SIZE}"
+                    )
+                return distance
+            except EOFError:
                 return base_dist
+        return base_dist
 
-        return None
-
-    def _create_fixed_huffman_lit_len_tree(self) -> dict:
+    @staticmethod
+    @functools.cache
+    def _create_fixed_huffman_lit_len_tree() -> tuple[array, int]:
         """
         Create a fixed Huffman tree for literals and lengths.
+        The tree is built once and shared by every fixed block.
 
         Returns:
-            Dictionary representing the Huffman tree
+            Decode table for the fixed literal/length code
         """
-        lengths = [8] * 144 + [9] * 112 + [7] * 24 + [8] * 8
-        return self._build_huffman_tree_from_lengths(lengths)
+        return Deflate._build_decode_table(FIXED_LIT_LEN_LENGTHS)
 
-    def _create_fixed_huffman_dist_tree(self) -> dict:
+    @staticmethod
+    @functools.cache
+    def _create_fixed_huffman_dist_tree() -> tuple[array, int]:
         """
         Create a fixed Huffman tree for distances.
+        The tree is built once and shared by every fixed block.
 
         Returns:
-            Dictionary representing the Huffman tree
+            Decode table for the fixed distance code
         """
-        lengths = [5] * 32
-        return self._build_huffman_tree_from_lengths(lengths)
+        return Deflate._build_decode_table(FIXED_DIST_LENGTHS)
 
-    def _build_huffman_tree_from_lengths(
-        self, lengths: list[int], is_distance_tree: bool = False
-    ) -> dict[tuple[int, int], int]:
+    @staticmethod
+    def _build_decode_table(lengths: Sequence[int]) -> tuple[array, int]:
         """
-        Build a Huffman tree from a list of code lengths.
+        Build a lookup table indexed by the next max_code_len bits of input.
+
+        Every code of length L owns the 2**(max_code_len - L) entries that
+        start with it; each entry stores (symbol << 4) | L, and 0 marks bit
+        patterns that do not start with any code.
 
         Args:
             lengths: List of code lengths
-            is_distance_tree: Whether this is a distance tree
 
         Returns:
-            Dictionary mapping (length, code) tuples to symbols
+            Tuple of (table, max_code_len)
         """
-        symbols_with_lengths = [
-            (length, symbol) for symbol, length in enumerate(lengths) if length > 0
-        ]
-
-        if not symbols_with_lengths:
-            return {}
-
-        symbols_with_lengths.sort()
-
-        decode_tree = {}
-        current_code = 0
-        current_length = symbols_with_lengths[0][0]
-
-        for length, symbol in symbols_with_lengths:
-            current_code <<= length - current_length
-            decode_tree[(length, current_code)] = symbol
-            current_code += 1
-            current_length = length
-
-        return decode_tree
+        counts, symbols, first_codes = _canonical_tree(lengths)
+        max_code_len = max(
+            (length for length in range(16) if counts[length]), default=0
+        )
+        table = array("I", bytes(4 << max_code_len))
+
+        index = 0
+        for length in range(1, max_code_len + 1):
+            shift = max_code_len - length
+            span = 1 << shift
+            for offset in range(counts[length]):
+                entry = (symbols[index] << 4) | length
+                start = (first_codes[length] + offset) << shift
+                table[start : start + span] = array("I", [entry] * span)
+                index += 1
+
+        return table, max_code_len
 
 
 if __name__ == "__main__":
@@ -5,11 +5,40 @@ Implementation of the LZ77 compression algorithm with DEFLATE-specific optimizat
 import mmap
 import os
 import struct
+from array import array
 from typing import Dict, List, Optional, Tuple, Union
 
 from bitarray import bitarray
 
 
+def _build_code_lookup(
+    code_table: List[Tuple[int, int, int]], max_value: int
+) -> Tuple[array, array, array]:
+    """
+    Expand a DEFLATE (code, base, extra_bits) table into per-value lookups.
+
+    Args:
+        code_table: Table of (code, base_value, extra_bits) ranges
+        max_value: Largest value covered by the table
+
+    Returns:
+        Tuple of (codes, extra_bits, extra_values) arrays indexed by value
+    """
+    codes = array("H", bytes(2 * (max_value + 1)))
+    extra_bits = array("B", bytes(max_value + 1))
+    extra_values = array("H", bytes(2 * (max_value + 1)))
+
+    # Later ranges overwrite earlier ones, so length 258 maps to code 285
+    # rather than to code 284 with extra value 31 (RFC 1951, 3.2.5)
+    for code, base, bits in code_table:
+        for value in range(base, min(base + (1 << bits) - 1, max_value) + 1):
+            codes[value] = code
+            extra_bits[value] = bits
+            extra_values[value] = value - base
+
+    return codes, extra_bits, extra_values
+
+
 class LZ77:
     """
     LZ77 compression algorithm implementation with DEFLATE-specific optimizations.
@@ -17,6 +46,10 @@ class LZ77:
     """
 
     MAX_WINDOW_SIZE = 32768
+    # After every 2**SKIP_TRIGGER_SHIFT consecutive failed probes the
+    # tokenizer emits one more literal per probe, up to MAX_LITERAL_SKIP
+    SKIP_TRIGGER_SHIFT = 5
+    MAX_LITERAL_SKIP = 8
     _length_table = [
         (257, 3, 0),
         (258, 4, 0),
@@ -82,6 +115,23 @@ class LZ77:
         (29, 24577, 13),
     ]
 
+    # Per-value (code, extra_bits, extra_value) lookups, built once
+    _length_codes, _length_extra_bits, _length_extra_values = _build_code_lookup(
+        _length_table, 258
+    )
+    _distance_codes, _distance_extra_bits, _distance_extra_values = (
+        _build_code_lookup(_distance_table, MAX_WINDOW_SIZE)
+    )
+
+    # Extra bits as emitted in DEFLATE mode: (extra_value << 4) | extra_bits
+    _length_extra_packed = array(
+        "I", [(v << 4) | n for n, v in zip(_length_extra_bits, _length_extra_values)]
+    )
+    _distance_extra_packed = array(
+        "I",
+        [(v << 4) | n for n, v in zip(_distance_extra_bits, _distance_extra_values)],
+    )
+
     def __init__(self, window_size: Optional[int] = None) -> None:
         """
         Initialize LZ77 compressor with specified window size.
@@ -94,11 +144,34 @@ class LZ77:
         self.window_size = min(window_size, self.MAX_WINDOW_SIZE)
         self.lookahead_buffer_size = 258
 
+    @staticmethod
+    def insert_positions(
+        data: bytes, start: int, end: int, hash_table: Dict[int, List[int]]
+    ) -> None:
+        """
+        Index a run of consecutive positions in the hash table in one pass.
+
+        Args:
+            data: Input data being tokenized
+            start: First position of the run
+            end: Position just past the run
+            hash_table: Hash table for quick match lookup
+        """
+        end = min(end, len(data) - 2)
+        for position in range(start, end):
+            hash_key = hash(data[position : position + 3])
+            candidates = hash_table.get(hash_key)
+            if candidates is None:
+                hash_table[hash_key] = [position]
+            else:
+                candidates.append(position)
+
     def find_match(
         self, data: bytes, current_position: int, hash_table: Dict[int, List[int]]
     ) -> Optional[Tuple[int, int]]:
         """
         Find the longest match in the search window using a hash table.
+        Positions are indexed by the caller via insert_positions.
 
         Args:
             data: Input data to search in
@@ -116,13 +189,6 @@ class LZ77:
         best_match_distance = 0
         best_match_length = 0
 
-        if current_position >= 2:
-            substring = data[current_position - 2 : current_position + 1]
-            hash_key_to_add = hash(substring)
-            if hash_key_to_add not in hash_table:
-                hash_table[hash_key_to_add] = []
-            hash_table[hash_key_to_add].append(current_position - 2)
-
         if current_position + 2 < len(data):
             current_substring = data[current_position : current_position + 3]
             hash_key_to_find = hash(current_substring)
@@ -167,16 +233,93 @@ class LZ77:
             return (best_match_distance, best_match_length)
         return None
 
+    def tokenize(
+        self, data: Union[bytes, mmap.mmap], verbose: bool = False
+    ) -> Tuple[array, array, array, array]:
+        """
+        Split a buffer into DEFLATE literal/length and distance symbols.
+
+        Args:
+            data: Bytes-like buffer to tokenize, e.g. a memory-mapped file
+            verbose: Whether to print debug information
+
+        Returns:
+            Tuple of (symbol_list, length_extra_bits, distance_list,
+            distance_extra_bits) where each extra-bits entry is packed as
+            (extra_value << 4) | extra_bit_count
+        """
+        # Tokens are mapped to DEFLATE symbols as soon as they are found,
+        # so no intermediate token list is materialized
+        # Typed arrays instead of lists of boxed ints, one per stream
+        symbol_list = array("H")
+        distance_list = array("B")
+        length_extra_bits = array("I")
+        distance_extra_bits = array("I")
+        no_extra_bits = array("I", bytes(4 * self.MAX_LITERAL_SKIP))
+        hash_table = {}
+        i = 0
+        misses = 0
+        len_codes = self._length_codes
+        len_extra = self._length_extra_packed
+        dist_codes = self._distance_codes
+        dist_extra = self._distance_extra_packed
+        insert_positions = self.insert_positions
+        if verbose:
+            print(f"Tokenizing {len(data)} bytes")
+
+        while i < len(data):
+            match = self.find_match(data, i, hash_table)
+            if match:
+                dist, length = match
+                if dist > self.window_size:
+                    byte = data[i]
+                    symbol_list.append(byte)
+                    length_extra_bits.append(0)
+                    insert_positions(data, i, i + 1, hash_table)
+                    i += 1
+                    continue
+                if dist > 0 and dist <= i:
+                    symbol_list.append(len_codes[length])
+                    length_extra_bits.append(len_extra[length])
+
+                    distance_list.append(dist_codes[dist])
+                    distance_extra_bits.append(dist_extra[dist])
+                    # Only the last position of a match is indexed;
+                    # indexing every byte roughly triples the search time
+                    insert_positions(data, i + length - 1, i + length, hash_table)
+                    i += length
+                    misses = 0
+                    continue
+            # Step through incompressible regions faster the longer
+            # they go without a match
+            misses += 1
+            step = min(
+                1 + (misses >> self.SKIP_TRIGGER_SHIFT),
+                self.MAX_LITERAL_SKIP,
+                len(data) - i,
+            )
+            symbol_list.extend(data[i : i + step])
+            length_extra_bits += no_extra_bits[:step]
+            # The whole literal run is indexed with a single call
+            insert_positions(data, i, i + step, hash_table)
+            i += step
+
+        # Verbose output is a single summary rather than a line per token
+        if verbose:
+            print(
+                f"Tokenized {len(data)} bytes into {len(symbol_list)} symbols "
+                f"({len(distance_list)} matches)"
+            )
+
+        return symbol_list, length_extra_bits, distance_list, distance_extra_bits
+
     def compress(
         self,
         input_file: str,
         output_file: Optional[str] = None,
         verbose: bool = False,
         deflate: bool = False,
-    ) -> Union[
-        bitarray,
-        Tuple[List[int], List[Tuple[int, int]], List[int], List[Tuple[int, int]]],
-    ]:
+    ) -> Union[bitarray, Tuple[array, array, array, array]]:
         """
         Compress input file using LZ77 algorithm with hash-based indexing.
 
@@ -188,76 +331,19 @@ class LZ77:
 
         Returns:
             Either a bitarray (if deflate=False) or a tuple of (symbol_list, length_extra_bits, distance_list, distance_extra_bits)
+            where each extra-bits entry is packed as (extra_value << 4) | extra_bit_count
         """
         _, ext = os.path.splitext(input_file)
         ext = ext.lstrip(".")
         ext_bytes = ext.encode("utf-8")
         ext_len = len(ext_bytes)
 
-        with open(input_file, "r+b") as f:
-            buf = mmap.mmap(f.fileno(), length=0, access=mmap.ACCESS_READ)
-            data = buf[:]
-
         if deflate:
-            tokens = []
-            hash_table = {}
-            i = 0
-            if verbose:
-                print(f"Tokenizing {input_file} ({len(data)} bytes)")
-
-            while i < len(data):
-                match = self.find_match(data, i, hash_table)
-                if match:
-                    dist, length = match
-                    if dist > self.window_size:
-                        byte = data[i]
-                        tokens.append(("lit", byte))
-                        if verbose:
-                            print(f"  Lit   @ {i}: {byte} (distance {dist} too large)")
-                        i += 1
-                        continue
-                    if dist > 0 and dist <= i:
-                        tokens.append(("match", dist, length))
-                        if verbose:
-                            print(f"  Match @ {i}: dist={dist}, len={length}")
-                        i += length
-                        continue
-                byte = data[i]
-                tokens.append(("lit", byte))
-                if verbose:
-                    print(f"  Lit   @ {i}: {byte}")
-                i += 1
-
-            if verbose:
-                print(
-                    f"Tokenized {len(data)} bytes into {len(tokens)} tokens: {tokens[:20]}"
-                )
-                if any(t[0] == "match" and t[1] > tokens.index(t) for t in tokens[:20]):
-                    print(
-                        "[DEBUG] WARNING: Early match with distance greater than current position detected!"
-                    )
-
-            symbol_list = []
-            distance_list = []
-            length_extra_bits = []
-            distance_extra_bits = []
-
-            for t in tokens:
-                if t[0] == "lit":
-                    symbol_list.append(t[1])
-                    length_extra_bits.append((0, 0))
-                else:
-                    dist, length = t[1], t[2]
-
-                    len_code, len_bits, len_val = self.map_length(length)
-                    symbol_list.append(len_code)
-                    length_extra_bits.append((len_bits, len_val))
-
-                    dist_code, dist_bits, dist_val = self.map_distance(dist)
-                    distance_list.append(dist_code)
-                    distance_extra_bits.append((dist_bits, dist_val))
-
-            return symbol_list, length_extra_bits, distance_list, distance_extra_bits
+            # The tokenizer reads straight from the mapped file
+            with open(input_file, "rb") as f, mmap.mmap(
+                f.fileno(), length=0, access=mmap.ACCESS_READ
+            ) as data:
+                return self.tokenize(data, verbose=verbose)
 
         # Non-DEFLATE compression implementation
         result = bitarray(endian="big")
@@ -280,6 +366,12 @@ class LZ77:
         Returns:
             Tuple of (code, extra_bits, extra_value)
         """
+        if 1 <= dist <= LZ77.MAX_WINDOW_SIZE:
+            return (
+                LZ77._distance_codes[dist],
+                LZ77._distance_extra_bits[dist],
+                LZ77._distance_extra_values[dist],
+            )
         for code, base_dist, extra_bits in LZ77._distance_table:
             if dist <= base_dist + (1 << extra_bits) - 1:
                 extra_val = dist - base_dist
@@ -297,6 +389,12 @@ class LZ77:
         Returns:
             Tuple of (code, extra_bits, extra_value)
         """
+        if 3 <= length <= 258:
+            return (
+                LZ77._length_codes[length],
+                LZ77._length_extra_bits[length],
+                LZ77._length_extra_values[length],
+            )
         for code, base_len, extra_bits in LZ77._length_table:
             if length <= base_len + (1 << extra_bits) - 1:
                 extra_val = length - base_len
@@ -0,0 +1,7 @@
+"""
+Bit order helpers for DEFLATE
+"""
+
+# Bit-reversed value of every byte. The stream is MSB-first, so LSB-first
+# fields and byte values go through this table on the way in and out
+REVERSED_BYTES = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
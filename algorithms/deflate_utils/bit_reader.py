@@ -1,7 +1,7 @@
 """
 Bit reader for DEFLATE
 """
-from bitarray import bitarray
+from algorithms.deflate_utils.bit_order import REVERSED_BYTES
 
 
 class BitReader:
@@ -10,17 +10,42 @@ class BitReader:
     Provides methods for reading individual bits and multi-bit values in both MSB and LSB order.
     """
 
+    # Bytes shifted into the bit buffer per refill
+    REFILL_BYTES = 7
+
     def __init__(self, filename: str) -> None:
         """
-        Initialize BitReader by reading the entire file into a bitarray.
+        Initialize BitReader by reading the entire file into memory.
+        Bits are served from an integer buffer that is refilled several
+        bytes at a time, so reads never go bit by bit.
 
         Args:
             filename: Path to the binary file containing the bit stream
         """
-        self.bits = bitarray(endian="big")
         with open(filename, "rb") as f:
-            self.bits.fromfile(f)
-        self.pos = 0
+            self.data = f.read()
+        self.byte_pos = 0
+        # The next bit of the stream is the highest of the low bit_count
+        # bits of bit_buffer; anything above them is stale
+        self.bit_buffer = 0
+        self.bit_count = 0
+
+    def _refill(self, n: int) -> None:
+        """
+        Shift whole bytes into the bit buffer until it holds at least n bits
+        or the input is exhausted.
+
+        Args:
+            n: Number of bits needed
+        """
+        data = self.data
+        while self.bit_count < n and self.byte_pos < len(data):
+            chunk = data[self.byte_pos : self.byte_pos + self.REFILL_BYTES]
+            self.byte_pos += len(chunk)
+            self.bit_buffer = (
+                (self.bit_buffer & ((1 << self.bit_count) - 1)) << (8 * len(chunk))
+            ) | int.from_bytes(chunk, "big")
+            self.bit_count += 8 * len(chunk)
 
     def read_bit(self) -> int:
         """
@@ -32,11 +57,12 @@ class BitReader:
         Raises:
             EOFError: If the bit stream is exhausted
         """
-        if self.pos >= len(self.bits):
-            raise EOFError("Bit stream length exceeded")
-        val = self.bits[self.pos]
-        self.pos += 1
-        return val
+        if self.bit_count < 1:
+            self._refill(1)
+            if self.bit_count < 1:
+                raise EOFError("Bit stream length exceeded")
+        self.bit_count -= 1
+        return (self.bit_buffer >> self.bit_count) & 1
 
     def read_bits_lsb(self, n: int) -> int:
         """
@@ -51,13 +77,12 @@ class BitReader:
         Raises:
             EOFError: If there are not enough bits to read
         """
-        if self.pos + n > len(self.bits):
+        if self.bits_remaining() < n:
             raise EOFError("Not enough bits to read (LSB)")
-        val = 0
-        for i in range(n):
-            bit = self.read_bit()
-            val |= bit << i
-        return val
+        if n == 0:
+            return 0
+        # The first bit read is the least significant one
+        return int(f"{self.read_bits_msb(n):0{n}b}"[::-1], 2)
 
     def read_bits_msb(self, n: int) -> int:
         """
@@ -72,19 +97,91 @@ class BitReader:
         Raises:
             EOFError: If there are not enough bits to read
         """
-        if self.pos + n > len(self.bits):
-            raise EOFError("Not enough bits to read (MSB)")
-        val = 0
-        for _ in range(n):
-            val = (val << 1) | self.read_bit()
-        return val
+        if self.bit_count < n:
+            self._refill(n)
+            if self.bit_count < n:
+                raise EOFError("Not enough bits to read (MSB)")
+        self.bit_count -= n
+        return (self.bit_buffer >> self.bit_count) & ((1 << n) - 1)
+
+    def peek_bits_msb(self, n: int) -> int:
+        """
+        Look at the next n bits in MSB-first order without consuming them.
+        Missing bits past the end of the stream read as zeros.
+
+        Args:
+            n: Number of bits to look at
+
+        Returns:
+            The value as an integer
+        """
+        if self.bit_count < n:
+            self._refill(n)
+            if self.bit_count < n:
+                return (self.bit_buffer & ((1 << self.bit_count) - 1)) << (
+                    n - self.bit_count
+                )
+        return (self.bit_buffer >> (self.bit_count - n)) & ((1 << n) - 1)
+
+    def consume(self, n: int) -> None:
+        """
+        Skip n bits that have already been looked at with peek_bits_msb.
+
+        Args:
+            n: Number of bits to skip
+
+        Raises:
+            EOFError: If there are not enough bits left
+        """
+        if self.bit_count < n:
+            self._refill(n)
+            if self.bit_count < n:
+                raise EOFError("Not enough bits to consume")
+        self.bit_count -= n
+
+    def bits_remaining(self) -> int:
+        """
+        Get the number of unread bits.
+
+        Returns:
+            Number of bits left in the stream
+        """
+        return self.bit_count + 8 * (len(self.data) - self.byte_pos)
+
+    def read_bytes(self, n: int) -> bytes:
+        """
+        Read n whole byte values, e.g. a stored block payload.
+        The reader must be byte-aligned, e.g. right after byte_align().
+        Each byte is stored LSB-first, so the result equals n calls to
+        read_bits_lsb(8), done with one slice and one translate.
+
+        Args:
+            n: Number of bytes to read
+
+        Returns:
+            The byte values
+
+        Raises:
+            ValueError: If the reader is not on a byte boundary
+            EOFError: If there are not enough bits left
+        """
+        if self.bit_count % 8:
+            raise ValueError("read_bytes requires a byte-aligned position")
+        if 8 * n > self.bits_remaining():
+            raise EOFError("Not enough bits to read")
+        # Bytes still in the bit buffer come first, the rest is sliced
+        # straight from the input
+        buffered = min(n, self.bit_count // 8)
+        head = self.read_bits_msb(8 * buffered).to_bytes(buffered, "big")
+        end = self.byte_pos + n - buffered
+        data = head + self.data[self.byte_pos : end]
+        self.byte_pos = end
+        return data.translate(REVERSED_BYTES)
 
     def byte_align(self) -> None:
         """
         Move the position to the start of the next byte.
         Used for processing uncompressed blocks (BTYPE=00).
         """
-        offset = self.pos % 8
-        if offset != 0:
-            skip = 8 - offset
-            self.pos += skip
+        # The buffer always ends on a byte boundary of the input
+        self.bit_count -= self.bit_count % 8
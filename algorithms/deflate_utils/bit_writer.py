@@ -1,17 +1,58 @@
 """
 Bit writer for DEFLATE
 """
-from bitarray import bitarray
+from typing import BinaryIO
+
+from algorithms.deflate_utils.bit_order import REVERSED_BYTES
+
 
 class BitWriter:
     """
-    A class for writing bits to a bitarray stream with byte alignment support.
+    A class for writing bits to a byte stream with byte alignment support.
     Provides methods for writing bits in both MSB and LSB order.
+
+    Bits are collected in an integer accumulator and moved to the output
+    buffer whole bytes at a time once at least 56 bits are pending. The
+    buffer can be preallocated; only its first `size` bytes are output.
     """
 
-    def __init__(self) -> None:
-        """Initialize a new BitWriter instance with an empty bitarray."""
-        self.bits = bitarray(endian="big")
+    FLUSH_THRESHOLD = 56
+
+    def __init__(self, initial_capacity: int = 0) -> None:
+        """
+        Initialize a new BitWriter instance with an empty buffer.
+
+        Args:
+            initial_capacity: Number of bytes to preallocate for the output
+        """
+        self.buffer = bytearray(initial_capacity)
+        self.size = 0
+        self._acc = 0
+        self._nbits = 0
+
+    def _ensure_capacity(self, nbytes: int) -> None:
+        """
+        Grow the buffer so that nbytes more bytes fit after `size`.
+
+        Args:
+            nbytes: Number of bytes about to be written
+        """
+        missing = self.size + nbytes - len(self.buffer)
+        if missing > 0:
+            self.buffer += bytes(max(missing, len(self.buffer)))
+
+    def _flush_bytes(self) -> None:
+        """Move all complete bytes from the accumulator to the buffer."""
+        nbytes = self._nbits >> 3
+        if nbytes == 0:
+            return
+        rest = self._nbits & 7
+        self._ensure_capacity(nbytes)
+        end = self.size + nbytes
+        self.buffer[self.size : end] = (self._acc >> rest).to_bytes(nbytes, "big")
+        self.size = end
+        self._acc &= (1 << rest) - 1
+        self._nbits = rest
 
     def write_bits_msb(self, value: int, length: int) -> None:
         """
@@ -29,8 +70,10 @@ class BitWriter:
             raise ValueError("Length cannot be negative")
         if length == 0:
             return
-        for i in range(length - 1, -1, -1):
-            self.bits.append((value >> i) & 1)
+        self._acc = (self._acc << length) | (value & ((1 << length) - 1))
+        self._nbits += length
+        if self._nbits >= self.FLUSH_THRESHOLD:
+            self._flush_bytes()
 
     def write_bits_lsb(self, value: int, length: int) -> None:
         """
@@ -48,31 +91,102 @@ class BitWriter:
             raise ValueError("Length cannot be negative")
         if length == 0:
             return
-        for i in range(length):
-            self.bits.append((value >> i) & 1)
+        reversed_value = 0
+        for shift in range(0, length, 8):
+            reversed_value = (reversed_value << 8) | REVERSED_BYTES[
+                (value >> shift) & 0xFF
+            ]
+        padding = -length & 7
+        self.write_bits_msb(reversed_value >> padding, length)
+
+    def write_packed_bytes(self, data: bytes) -> None:
+        """
+        Copy bytes that already hold stream bits, in MSB-first order, into
+        the buffer without going through the bit accumulator.
+
+        Args:
+            data: Packed stream bytes to append
+
+        Raises:
+            ValueError: If the writer is not on a byte boundary
+        """
+        if self._nbits & 7:
+            raise ValueError("write_packed_bytes requires a byte-aligned writer")
+        self._flush_bytes()
+        self._ensure_capacity(len(data))
+        self.buffer[self.size : self.size + len(data)] = data
+        self.size += len(data)
+
+    def write_aligned_bytes(self, data: bytes) -> None:
+        """
+        Write whole byte values, e.g. a stored block payload. Like every
+        byte-valued field they are stored LSB-first, the same as
+        write_bits_lsb(byte, 8) for each byte, but in one translate call.
+
+        Args:
+            data: Bytes to append
+
+        Raises:
+            ValueError: If the writer is not on a byte boundary
+        """
+        if self._nbits & 7:
+            raise ValueError("write_aligned_bytes requires a byte-aligned writer")
+        self.write_packed_bytes(bytes(data).translate(REVERSED_BYTES))
+
+    def extend(self, other: "BitWriter") -> None:
+        """
+        Append every bit written to another BitWriter, including its
+        pending partial byte.
+
+        Args:
+            other: The BitWriter whose bits to append
+        """
+        if other.size:
+            data = memoryview(other.buffer)[: other.size]
+            if self._nbits & 7 == 0:
+                self.write_packed_bytes(data)
+            else:
+                self.write_bits_msb(int.from_bytes(data, "big"), 8 * other.size)
+        self.write_bits_msb(other._acc, other._nbits)
+
+    def flush_completed_bytes(self, fileobj: BinaryIO) -> None:
+        """
+        Write every complete byte to an open file and drop it from the
+        buffer. Bits of a trailing partial byte stay pending.
+
+        Args:
+            fileobj: Binary file object to write to
+        """
+        self._flush_bytes()
+        fileobj.write(memoryview(self.buffer)[: self.size])
+        self.size = 0
 
     def flush_to_file(self, filename: str) -> None:
         """
-        Write the bitarray to a file with byte alignment.
+        Write the buffered bits to a file with byte alignment.
 
         Args:
             filename: Path to the output file
         """
-        while len(self.bits) % 8 != 0:
-            self.bits.append(0)
+        self.byte_align()
         with open(filename, "wb") as f:
-            self.bits.tofile(f)
+            f.write(memoryview(self.buffer)[: self.size])
 
-    def get_bitarray(self) -> bitarray:
+    def get_bytes(self) -> bytes:
         """
-        Get the current state of the bit array without alignment.
+        Get the bytes written so far, with any trailing partial byte
+        padded with zero bits. The writer itself is left unchanged.
 
         Returns:
-            The current bit array
+            The buffered bit stream as bytes
         """
-        return self.bits
+        padding = -self._nbits & 7
+        tail = (self._acc << padding).to_bytes((self._nbits + padding) >> 3, "big")
+        return bytes(self.buffer[: self.size]) + tail
 
     def byte_align(self) -> None:
         """Add padding bits to achieve byte alignment."""
-        while len(self.bits) % 8 != 0:
-            self.bits.append(0)
+        padding = -self._nbits & 7
+        self._acc <<= padding
+        self._nbits += padding
+        self._flush_bytes()
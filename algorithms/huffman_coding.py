@@ -3,14 +3,77 @@ Huffman coding algorithm -
 data compression algorithm
 """
 
-import base64
 import heapq
 import json
 import mmap
 import os
-from collections import defaultdict, deque
+from collections import Counter
 
-from bitarray import bitarray
+from bitarray import bitarray, decodetree
+
+
+def sorted_code_lengths(weights: list[int]) -> list[int]:
+    """
+    Function computes Huffman code lengths in place, without building
+    a tree (Moffat and Katajainen, "In-place calculation of
+    minimum-redundancy codes", 1995).
+    The weights must be sorted in ascending order; the result is wrong
+    otherwise. A single weight gets length 1, no weights an empty list.
+
+    :param weights: list, weights in ascending order
+    :return: list, code length of every weight, in the same order
+    """
+    a = list(weights)
+    n = len(a)
+    if n < 2:
+        return [1] * n
+
+    # Phase 1: merge the two smallest items n - 1 times; merged weights
+    # are stored in the front of the list and then replaced by the index
+    # of their parent
+    a[0] += a[1]
+    root = 0
+    leaf = 2
+    for nxt in range(1, n - 1):
+        if leaf >= n or a[root] < a[leaf]:
+            a[nxt] = a[root]
+            a[root] = nxt
+            root += 1
+        else:
+            a[nxt] = a[leaf]
+            leaf += 1
+        if leaf >= n or (root < nxt and a[root] < a[leaf]):
+            a[nxt] += a[root]
+            a[root] = nxt
+            root += 1
+        else:
+            a[nxt] += a[leaf]
+            leaf += 1
+
+    # Phase 2: turn parent indices into depths of the internal nodes
+    a[n - 2] = 0
+    for nxt in range(n - 3, -1, -1):
+        a[nxt] = a[a[nxt]] + 1
+
+    # Phase 3: count the leaves on every level, filling lengths from the
+    # back so the smallest weights get the longest codes
+    available = 1
+    used = 0
+    depth = 0
+    root = n - 2
+    nxt = n - 1
+    while available > 0:
+        while root >= 0 and a[root] == depth:
+            used += 1
+            root -= 1
+        while available > used:
+            a[nxt] = depth
+            nxt -= 1
+            available -= 1
+        available = 2 * used
+        depth += 1
+        used = 0
+    return a
 
 
 class Node:
@@ -41,6 +104,8 @@ class HuffmanTree:
     and decoding.
     """
 
+    CHUNK_SIZE = 1 << 20  # bytes of input encoded per write
+
     def __init__(self, data=None):
         """
         Function initializes the structure of Huffman Tree.
@@ -61,16 +126,18 @@ class HuffmanTree:
         :param data: data to count symbol frequency for
         :return: dict, dictionary with symbol frequency
         """
-        char_frequency_dict = defaultdict(int)
-        for el in data:
-            char_frequency_dict[el] += 1
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            # byte alphabet: Counter tallies in C; keep byte order for the tree
+            return dict(sorted(Counter(data).items()))
 
-        return char_frequency_dict
+        # any other iterable: symbols stay in first-seen order
+        return dict(Counter(data))
 
     def codes_generation(self, node=None, curr_code=""):
         """
-        Recursive function that generates
-        code for each symbol, preoder traversal of Huffman's tree
+        Function generates code for each symbol, preoder traversal
+        of Huffman's tree with an explicit stack instead of recursion,
+        so deep trees cannot exceed the recursion limit.
 
         :param node: node to start traversal from
         :param curr_code: str, current code of a symbol
@@ -80,32 +147,70 @@ class HuffmanTree:
         if node is None:
             node = self.root
 
-        # if our node is a leaf than we write the code for it
-        if node.left is None and node.right is None:
-            self.res_codes.setdefault(node.value, curr_code)
-            return
+        # stack entries are (node, code as an int, code length); the code
+        # is only formatted as a string once a leaf is reached
+        stack = [(node, int(curr_code or "0", 2), len(curr_code))]
+        while stack:
+            node, code, length = stack.pop()
+
+            # if our node is a leaf than we write the code for it
+            # (a tree of a single leaf still needs a one-bit code)
+            if node.left is None and node.right is None:
+                self.res_codes.setdefault(
+                    node.value, format(code, f"0{length}b") if length else "0"
+                )
+                continue
+
+            # right is pushed first, so the left subtree is visited first
+            stack.append((node.right, (code << 1) | 1, length + 1))
+            stack.append((node.left, code << 1, length + 1))
+
+    def code_lengths(self) -> list:
+        """
+        Function finds the depth of every leaf of Huffman's tree, which
+        is all that canonical codes need, without building code strings.
 
-        self.codes_generation(node.left, curr_code + "0")
-        self.codes_generation(node.right, curr_code + "1")
+        :return: list, code length of every byte value, 0 for bytes
+            that are not in the tree
+        """
+        code_lengths = [0] * 256
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node.left is None and node.right is None:
+                # (a tree of a single leaf still needs a one-bit code)
+                code_lengths[node.value] = depth or 1
+                continue
+            stack.append((node.right, depth + 1))
+            stack.append((node.left, depth + 1))
+        return code_lengths
 
     def tree(self):
         """
         Function builds Huffman Tree.
+
+        Heap entries are (frequency, order, node) tuples, so comparisons
+        stay in C and equal frequencies are merged in a stable order.
         """
-        nodes = self.nodes[:]
+        nodes = [(node.val_freq, order, node) for order, node in enumerate(self.nodes)]
         heapq.heapify(nodes)
+        order = len(nodes)
         while len(nodes) != 1:
             # left smallest node
-            l = heapq.heappop(nodes)
-            # rigth smallest node
-            r = heapq.heappop(nodes)
+            l_freq, _, l = heapq.heappop(nodes)
+            # rigth smallest node, replaced below by the merged node in one
+            # sift instead of a pop and a push
+            r_freq, _, r = nodes[0]
 
             # creating new merged node from the smallest left and right
-            new_merged_node = Node("", l.val_freq + r.val_freq)
+            new_merged_node = Node("", l_freq + r_freq)
             new_merged_node.left, new_merged_node.right = l, r
-            heapq.heappush(nodes, new_merged_node)
+            heapq.heapreplace(
+                nodes, (new_merged_node.val_freq, order, new_merged_node)
+            )
+            order += 1
 
-        self.root = nodes[0]
+        self.root = nodes[0][2]
 
     def compress_file(
         self,
@@ -124,38 +229,81 @@ class HuffmanTree:
 
         with open(input_f, "rb") as f:
             mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-            data = mm[:]
-
+        # a view of the mapping instead of a copy; the frequency count and
+        # the per-chunk slices below read the mapped pages directly
+        data = memoryview(mm)
+
+        # only the code lengths are stored and the codes are made canonical,
+        # so without a tree given by the caller the lengths are computed
+        # straight from the frequencies, with no Node objects
+        code_lengths = [0] * 256
         if not self.root:
             self.char_frequency_dict = self.char_frequency(data)
-            self.nodes = []
-            for val, val_freq in self.char_frequency_dict.items():
-                self.nodes.append(Node(val, val_freq))
-            self.tree()
-            self.codes_generation()
+            chars = sorted(
+                self.char_frequency_dict, key=self.char_frequency_dict.__getitem__
+            )
+            if len(chars) == 1:
+                # a single byte value still needs a one-bit code
+                code_lengths[chars[0]] = 1
+            elif chars:
+                weights = [self.char_frequency_dict[char] for char in chars]
+                for char, length in zip(chars, sorted_code_lengths(weights)):
+                    code_lengths[char] = length
+        else:
+            code_lengths = self.code_lengths()
+        self.res_codes = self.canonical_codes(code_lengths)
+
+        # codes as bitarrays, so bitarray.encode turns a whole chunk into
+        # bits in one call instead of one extend per byte
+        code_table = {char: bitarray(code) for char, code in self.res_codes.items()}
 
+        # encode a chunk at a time and write out the whole bytes right away,
+        # so only the trailing partial byte is kept between chunks
         res = bitarray()
-        for char in data:
-            res.extend(self.res_codes[char])
-        bit_lengths = len(res)
+        bit_lengths = 0
+        with open(output_f, "wb") as f:
+            for start in range(0, len(data), self.CHUNK_SIZE):
+                res.encode(code_table, data[start : start + self.CHUNK_SIZE])
+                whole_bits = len(res) & ~7
+                f.write(res[:whole_bits].tobytes())
+                del res[:whole_bits]
+                bit_lengths += whole_bits
+            bit_lengths += len(res)
+            res.tofile(f)
 
         with open(output_dict_f, "w", encoding="utf-8") as f:
-            final_codes = {v: k for k, v in self.res_codes.items()}
             final_data = {
                 "file_extension": f_extension,
                 "bit_lengths": bit_lengths,
-                "codes_dict": {
-                    k: base64.b64encode(bytes([v])).decode("ascii")
-                    for k, v in final_codes.items()
-                },
+                "code_lengths": code_lengths,
             }
             json.dump(final_data, f)
 
-        with open(output_f, "wb") as f:
-            res.tofile(f)
-
         return output_f
 
+    @staticmethod
+    def canonical_codes(code_lengths: list) -> dict:
+        """
+        Function assigns canonical Huffman codes: shorter codes come first
+        and codes of equal length follow byte order, so the codes are
+        fully determined by their lengths.
+
+        :param code_lengths: list, code length of every byte value,
+            0 for bytes that do not occur
+        :return: dict, byte value -> code string
+        """
+        codes = {}
+        code = 0
+        prev_length = 0
+        for length, char in sorted(
+            (length, char) for char, length in enumerate(code_lengths) if length
+        ):
+            code <<= length - prev_length
+            codes[char] = format(code, f"0{length}b")
+            code += 1
+            prev_length = length
+        return codes
+
     @staticmethod
     def decompress_file(
         input_f="compressed_huffman.bin", input_dict_f="compressed_huffman_dict.json",
@@ -169,34 +317,27 @@ class HuffmanTree:
         :param output_f: str, file to write decoded data to
         """
         with open(input_f, "rb") as f:
-            data = bitarray()
-            data.fromfile(f)
+            data = f.read()
 
         with open(input_dict_f, "r", encoding="utf-8") as f:
             res_dict = json.load(f)
 
         real_bits = res_dict["bit_lengths"]
-        data = data.to01()[:real_bits]
-        data = deque(data)
         f_extension = res_dict["file_extension"]
-        res_dict = {
-            k: int.from_bytes(base64.b64decode(v), "big")
-            for k, v in res_dict["codes_dict"].items()
-        }
+        code_lengths = res_dict["code_lengths"]
 
         if user_output_f:
             output_f = f'./res_decompression/decompressed_{user_output_f}{f_extension}'
         else:
             output_f = f"decompressed{f_extension}"
-        decoded_data = []
-        curr_code = ""
-
-        while data:
-            curr_el = data.popleft()
-            curr_code += str(curr_el)
-            if curr_code in res_dict:
-                decoded_data.append(res_dict[curr_code])
-                curr_code = ""
+
+        # bitarray walks its prefix-code tree in C, one pass over the stream
+        codes = HuffmanTree.canonical_codes(code_lengths)
+        tree = decodetree({char: bitarray(code) for char, code in codes.items()})
+        bits = bitarray()
+        bits.frombytes(data)
+        del bits[real_bits:]
+        decoded_data = bits.decode(tree)
 
         with open(output_f, "wb") as f:
             f.write(bytes(decoded_data))
@@ -5,7 +5,7 @@ Main file that controls GUI
 import os
 import sys
 
-from PyQt6.QtCore import QSize, Qt
+from PyQt6.QtCore import QObject, QSize, Qt, QThread, pyqtSignal
 from PyQt6.QtWidgets import (
     QApplication,
     QComboBox,
@@ -27,6 +27,31 @@ from algorithms.LZW import LZWCompressor
 from algorithms.image_utils.RLE import RLECompressor
 from algorithms.wav_compression_deflate import WAVCompressor
 
+
+class Worker(QObject):
+    """
+    class runs a compression or decompression call off the GUI thread
+    """
+
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+
+    def run(self):
+        """
+        function runs the task and reports whether it succeeded
+        """
+        try:
+            self.task()
+        except Exception as error:
+            self.failed.emit(str(error))
+        else:
+            self.finished.emit()
+
+
 class MainWindow(QMainWindow):
     """
     class controls main window
@@ -37,6 +62,86 @@ class MainWindow(QMainWindow):
         self.setFixedSize(QSize(800, 750))
         self.setWindowTitle("Compression Data Application")
 
+        self._thread = None
+        self._worker = None
+        self._on_finished = None
+
+        # Compressors are created once and reused for every click
+        self._compressors = {
+            "Huffman":{
+                "acceptable_extensions": [
+                    ".jpg",
+                    ".tiff",
+                    ".wav",
+                    ".txt",
+                    ".csv",
+                    ".json",
+                    ".jpeg",
+                     ".bmp",
+                    ".bin",
+                ],
+                "Huffman": HuffmanTree()
+            },
+            "LZW": {
+                "acceptable_extensions":[
+                    ".txt",
+                    ".csv",
+                    ".json",
+                    ".bin"
+                ],
+                "LZW": LZWCompressor()
+            },
+            "LZ78":{
+                "acceptable_extensions":[
+                    ".txt",
+                    ".csv",
+                    ".json",
+                    ".bin"
+                ],
+                "LZ78": LZ78Compressor(),
+            },
+            "LZ77":{
+                "acceptable_extensions":[
+                    ".txt",
+                    ".tiff",
+                    ".csv",
+                    ".json",
+                    ".bin"
+                ],
+                "LZ77": LZ77(),
+            },
+            "RLE":{
+                "acceptable_extensions": [
+                    ".jpg",
+                    ".tiff",
+                    ".jpeg",
+                    ".bmp",
+                    ".bin",
+                ],
+                "RLE": RLECompressor()
+            },
+            "Deflate":{
+                "acceptable_extensions": [
+                    ".jpg",
+                    ".tiff",
+                    ".wav",
+                    ".txt",
+                    ".csv",
+                    ".json",
+                    ".jpeg",
+                    ".bmp",
+                    ".bin",
+                ],
+                "Deflate": Deflate()
+            },
+            "DPCM":{
+                "acceptable_extensions": [
+                    ".wav"
+                ],
+                "DPCM": WAVCompressor()
+            }
+        }
+
         self.central_widget = QWidget()
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(40, 30, 40, 30)
@@ -241,92 +346,26 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "No file to compress, select it first")
             return
 
-        algorithms_to_call = {
-            "Huffman":{
-                "acceptable_extensions": [
-                    ".jpg",
-                    ".tiff",
-                    ".wav",
-                    ".txt",
-                    ".csv",
-                    ".json",
-                    ".jpeg",
-                     ".bmp",
-                    ".bin",
-                ],
-                "Huffman": HuffmanTree()
-            },
-            "LZW": {
-                "acceptable_extensions":[
-                    ".txt",
-                    ".csv",
-                    ".json",
-                    ".bin"
-                ],
-                "LZW": LZWCompressor()
-            },
-            "LZ78":{
-                "acceptable_extensions":[
-                    ".txt",
-                    ".csv",
-                    ".json",
-                    ".bin"
-                ],
-                "LZ78": LZ78Compressor(),
-            },
-            "LZ77":{
-                "acceptable_extensions":[
-                    ".txt",
-                    ".tiff",
-                    ".csv",
-                    ".json",
-                    ".bin"
-                ],
-                "LZ77": LZ78Compressor(),
-            },
-            "RLE":{
-                "acceptable_extensions": [
-                    ".jpg",
-                    ".tiff",
-                    ".jpeg",
-                    ".bmp",
-                    ".bin",
-                ],
-                "RLE": RLECompressor()
-            },
-            "Deflate":{
-                "acceptable_extensions": [
-                    ".jpg",
-                    ".tiff",
-                    ".wav",
-                    ".txt",
-                    ".csv",
-                    ".json",
-                    ".jpeg",
-                    ".bmp",
-                    ".bin",
-                ],
-                "Deflate": Deflate()
-            },
-            "DPCM":{
-                "acceptable_extensions": [
-                    ".wav"
-                ],
-                "DPCM": WAVCompressor()
-            }
-        }
         file_ext = os.path.splitext(self.selected_file)[1].lower()
         algorithm = self.algorithms_box.currentText()
-        if algorithm in algorithms_to_call:
-            if file_ext in algorithms_to_call[algorithm]['acceptable_extensions']:
-                file_to_encode = algorithms_to_call[algorithm].get(algorithm)
-                file_to_encode.compress_file(self.selected_file)
+        if algorithm in self._compressors:
+            if file_ext in self._compressors[algorithm]['acceptable_extensions']:
+                file_to_encode = self._compressors[algorithm].get(algorithm)
+                selected_file = self.selected_file
+                self.run_in_background(
+                    lambda: file_to_encode.compress_file(selected_file),
+                    lambda: self.compression_finished(algorithm),
+                )
             else:
                 QMessageBox.warning(self, "Error", \
                 f"This extension is not supported by this algorithm. Choose one of those:{', '.join(ext \
-                for ext in algorithms_to_call[algorithm]['acceptable_extensions'])}")
+                for ext in self._compressors[algorithm]['acceptable_extensions'])}")
                 return
 
+    def compression_finished(self, algorithm):
+        """
+        function shows the result of a finished compression
+        """
         self.compression_done = True
         self.compress_file_size = os.stat(f"compressed_{algorithm.lower()}.bin").st_size
         self.compressed_size_label.setText(
@@ -347,22 +386,55 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "No file to compress, select it first")
             return
 
-        algorithms_to_call = {
-            "Huffman": HuffmanTree(),
-            "LZW": LZWCompressor(),
-            "LZ78": LZ78Compressor(),
-            "LZ77": LZ77(),
-            "RLE": RLECompressor(),
-            "Deflate": Deflate(),
-            "DPCM": WAVCompressor()
-        }
         algorithm = self.algorithms_box.currentText()
 
-        if algorithm in algorithms_to_call:
-            file_to_encode = algorithms_to_call.get(algorithm)
-            file_to_encode.decompress_file()
+        if algorithm in self._compressors:
+            file_to_encode = self._compressors[algorithm].get(algorithm)
+            self.run_in_background(
+                file_to_encode.decompress_file,
+                lambda: QMessageBox.information(
+                    self, "Success", "File was decompressed!"
+                ),
+            )
 
-        QMessageBox.information(self, "Success", "File was decompressed!")
+    def run_in_background(self, task, on_finished):
+        """
+        function runs task on a worker thread, so the window keeps
+        responding, and calls on_finished on the GUI thread afterwards
+        """
+        self.compress_button.setEnabled(False)
+        self.decompress_button.setEnabled(False)
+
+        self._on_finished = on_finished
+        self._thread = QThread()
+        self._worker = Worker(task)
+        self._worker.moveToThread(self._thread)
+        self._thread.started.connect(self._worker.run)
+        self._worker.finished.connect(self.task_finished)
+        self._worker.failed.connect(self.task_failed)
+        self._worker.finished.connect(self._thread.quit)
+        self._worker.failed.connect(self._thread.quit)
+        self._thread.finished.connect(self.task_done)
+        self._thread.start()
+
+    def task_finished(self):
+        """
+        function calls the callback of the task that just finished
+        """
+        self._on_finished()
+
+    def task_failed(self, message):
+        """
+        function reports an error raised on the worker thread
+        """
+        QMessageBox.warning(self, "Error", message)
+
+    def task_done(self):
+        """
+        function enables the buttons again once the worker thread stopped
+        """
+        self.compress_button.setEnabled(True)
+        self.decompress_button.setEnabled(True)
 
 
 if __name__ == "__main__":
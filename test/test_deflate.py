@@ -0,0 +1,114 @@
+"""
+Regression tests for the DEFLATE implementation.
+Run from the repository root with: python -m unittest discover test
+"""
+import os
+import random
+import tempfile
+import unittest
+import zlib
+
+from algorithms.deflate import Deflate
+from algorithms.deflate_utils.bit_order import REVERSED_BYTES
+from algorithms.deflate_utils.bit_writer import BitWriter
+
+
+def _mirror(stream: bytes) -> bytes:
+    """
+    Convert between an RFC 1951 stream and this container, which stores
+    every byte bit-mirrored (MSB-first).
+    """
+    return stream.translate(REVERSED_BYTES)
+
+
+class TestDeflate(unittest.TestCase):
+    """
+    Round-trip and decoding checks for Deflate.
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.tmp, name)
+
+    def _decompress(self, stream: bytes) -> bytes:
+        compressed = self._path("stream.bin")
+        with open(compressed, "wb") as f:
+            f.write(stream)
+        return bytes(Deflate().decompress_file(compressed, self._path("out")))
+
+    def test_block_without_matches_round_trips(self):
+        # Over 32 symbols and no LZ77 match, so the distance tree of the
+        # block has no used symbols
+        data = bytes(range(100))
+        original = self._path("distinct.bin")
+        with open(original, "wb") as f:
+            f.write(data)
+        compressed = self._path("distinct_deflate.bin")
+        Deflate().compress_file(original, compressed)
+
+        self.assertEqual(
+            bytes(Deflate().decompress_file(compressed, self._path("out"))), data
+        )
+
+    def test_stored_block_written_by_bit_writer(self):
+        payload = bytes(range(256)) * 3
+        writer = BitWriter()
+        writer.write_bits_lsb(3, 8)
+        for byte in b"bin":
+            writer.write_bits_lsb(byte, 8)
+        writer.write_bits_msb(1, 1)  # BFINAL
+        writer.write_bits_lsb(0, 2)  # BTYPE=00
+        writer.byte_align()
+        writer.write_bits_lsb(len(payload), 16)
+        writer.write_bits_lsb(len(payload) ^ 0xFFFF, 16)
+        writer.write_aligned_bytes(payload)
+
+        self.assertEqual(self._decompress(writer.get_bytes()), payload)
+
+    def _compress_to_raw(self, data: bytes) -> bytes:
+        """
+        Compress data with Deflate and return the blocks as an RFC 1951
+        stream, without this container's extension header.
+        """
+        original = self._path("input.txt")
+        with open(original, "wb") as f:
+            f.write(data)
+        compressed = self._path("input_deflate.bin")
+        Deflate().compress_file(original, compressed)
+        with open(compressed, "rb") as f:
+            stream = _mirror(f.read())
+        return stream[1 + stream[0] :]
+
+    def test_dynamic_blocks_decode_with_zlib(self):
+        words = [b"deflate", b"huffman", b"block", b"symbol", b"tree", b"code"]
+        rng = random.Random(0)
+        data = b" ".join(rng.choice(words) for _ in range(4000))
+        raw = self._compress_to_raw(data)
+
+        self.assertEqual((raw[0] >> 1) & 3, 2)  # BTYPE=10
+        self.assertEqual(zlib.decompressobj(-15).decompress(raw), data)
+
+    def test_fixed_block_decodes_with_zlib(self):
+        data = b"abracadabra"
+        raw = self._compress_to_raw(data)
+
+        self.assertEqual((raw[0] >> 1) & 3, 1)  # BTYPE=01
+        self.assertEqual(zlib.decompressobj(-15).decompress(raw), data)
+
+    def test_mirrored_zlib_stream_decodes(self):
+        data = b"stored blocks carry their payload byte by byte. " * 200
+        for level in (0, 9):
+            with self.subTest(level=level):
+                compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+                raw = compressor.compress(data) + compressor.flush()
+                stream = _mirror(bytes([3]) + b"txt" + raw)
+                self.assertEqual(self._decompress(stream), data)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+"""
+Regression tests for the Huffman coding helpers.
+Run from the repository root with: python -m unittest discover test
+"""
+import unittest
+
+from algorithms.huffman_coding import sorted_code_lengths
+
+
+class TestSortedCodeLengths(unittest.TestCase):
+    """
+    Checks for sorted_code_lengths.
+    """
+
+    def test_fewer_than_two_weights(self):
+        self.assertEqual(sorted_code_lengths([]), [])
+        self.assertEqual(sorted_code_lengths([7]), [1])
+
+    def test_lengths_follow_weights(self):
+        self.assertEqual(sorted_code_lengths([1, 1]), [1, 1])
+        self.assertEqual(sorted_code_lengths([1, 1, 2, 4]), [3, 3, 2, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
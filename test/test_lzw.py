@@ -0,0 +1,47 @@
+"""
+Regression tests for the LZW implementation.
+Run from the repository root with: python -m unittest discover test
+"""
+import random
+import unittest
+
+from algorithms.LZW import LZWCompressor
+
+
+class TestLZW(unittest.TestCase):
+    """
+    Round trips through the bit-packed LZW format.
+    """
+
+    def _round_trip(self, data: bytes):
+        packed = LZWCompressor.compress(data)
+        self.assertIsInstance(packed, bytes)
+        self.assertEqual(LZWCompressor.decompress(packed), data)
+
+    def test_empty_input(self):
+        self.assertEqual(LZWCompressor.compress(b""), b"")
+        self.assertEqual(LZWCompressor.decompress(b""), b"")
+
+    def test_single_byte(self):
+        self.assertEqual(len(LZWCompressor.compress(b"a")), 2)
+        self._round_trip(b"a")
+
+    def test_repeats(self):
+        # each new entry is used right away, the case where the decoder
+        # sees a code it has not added yet
+        self._round_trip(b"a" * 10000)
+        self._round_trip(b"ab" * 5000)
+
+    def test_text_grows_code_width(self):
+        rng = random.Random(0)
+        words = [b"lorem", b"ipsum", b"dolor", b"sit", b"amet", b"consectetur"]
+        data = b" ".join(rng.choice(words) for _ in range(20000))
+        data += bytes(range(256))
+        packed = LZWCompressor.compress(data)
+        # more than 2**12 entries, so the width grew past 12 bits
+        self.assertLess(len(packed), len(data) // 2)
+        self._round_trip(data)
+
+
+if __name__ == "__main__":
+    unittest.main()